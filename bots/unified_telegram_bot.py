@@ -4,38 +4,101 @@
 Содержит функционал эскроу-сделок на TRON и аналитику криптовалют
 """
 
+import asyncio
 import os
 import logging
 import json
+import re
 import uuid
+import heapq
+import functools
 import sys
 from datetime import datetime, timedelta
+from collections import defaultdict
+from types import MappingProxyType
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.constants import ParseMode
 from telegram.ext import Application, CommandHandler, CallbackQueryHandler, MessageHandler, filters, ContextTypes
+from telegram.request import HTTPXRequest
 from dotenv import load_dotenv
 
+# AIORateLimiter требует extra python-telegram-bot[rate-limiter] (aiolimiter);
+# без него бот работает как раньше, но без сглаживания лимитов Telegram
+try:
+    import aiolimiter  # noqa: F401
+    from telegram.ext import AIORateLimiter
+except ImportError:
+    AIORateLimiter = None
+
 # Загружаем переменные окружения
 load_dotenv()
 
+# Пути проекта считаются один раз при импорте модуля
+_BOTS_DIR = os.path.dirname(os.path.abspath(__file__))
+_PROJECT_DIR = os.path.join(_BOTS_DIR, '..')
+_CONFIG_PATH = os.path.join(_PROJECT_DIR, 'config.json')
+_USERS_JSON = os.path.join(_BOTS_DIR, 'users_data.json')
+_PENDING_JSON = os.path.join(_BOTS_DIR, 'pending_transactions.json')
+_DB_PATH = os.path.join(_BOTS_DIR, 'unified_escrow.db')
+
+# TRON адрес: 'T' + 33 символа Base58 (без 0, O, I, l)
+_TRON_ADDRESS_RE = re.compile(r'^T[1-9A-HJ-NP-Za-km-z]{33}$')
+
+# Разбор callback'ов вида 'coin_btc', 'chart_eth_1h', 'funding_sol', 'longshort_trx'
+_COIN_CALLBACK_RE = re.compile(r'^(chart|coin|funding|longshort)_([a-z]+)(?:_(\w+))?$')
+
 # Добавляем путь к проекту для импорта модулей
-sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
-
-# Импорты для криптоаналитики
-from crypto_api.binance_api.binanceApi import Candles_info_binanceApi, get_binance_funding_rate
-from crypto_api.coingeko_api.coingekoApi import CoinGeko_market_cap, CoinGeko_btc_dominance
-from crypto_api.yfinance_api.yfinanceApi import Yfinance_get_index_stats
-from crypto_api.bybit_api.bybitApi import get_funding_rate, get_long_short_ratio
-from crypto_api.alternativeme_api.alternativemeApi import FearGreedAPI
-
-# Импорт для эскроу (копируем из скриптов)
-from scripts.tron_escrow_usdt_client import TronEscrowUSDTClient
-from binance.client import Client
+sys.path.append(_PROJECT_DIR)
+
+# Тяжелые модули (crypto_api, tronpy, qrcode) импортируются лениво
+# в обработчиках — при старте бота они не нужны
 import time
-import qrcode
-from io import BytesIO
 import base64
+import html
 import sqlite3
+import threading
+
+# orjson (C-расширение) заметно быстрее стандартного json на горячих путях
+try:
+    import orjson
+
+    def _json_dumps(obj):
+        return orjson.dumps(obj).decode()
+
+    def _json_dumps_bytes(obj):
+        return orjson.dumps(obj)
+
+    _json_loads = orjson.loads
+except ImportError:
+    def _json_dumps(obj):
+        return json.dumps(obj, ensure_ascii=False)
+
+    def _json_dumps_bytes(obj):
+        return json.dumps(obj).encode()
+
+    _json_loads = json.loads
+
+# pybase64 использует SIMD (SSSE3/AVX2) для кодирования — выбирается автоматически
+try:
+    import pybase64 as _base64
+except ImportError:
+    _base64 = base64
+
+# TTL-словарь для состояний диалога: брошенные на полпути сценарии
+# не копятся в памяти, а вытесняются по таймауту
+try:
+    from cachetools import TTLCache
+except ImportError:
+    TTLCache = None
+
+
+def _encode_tronlink_payload(transaction_data):
+    """JSON-сериализация и base64url-кодирование payload для TronLink URL.
+
+    base64url без '=' не требует percent-encoding в query string,
+    поэтому URL короче и не проходит лишний проход экранирования.
+    """
+    return _base64.urlsafe_b64encode(_json_dumps_bytes(transaction_data)).rstrip(b'=').decode('ascii')
 
 # Настройка логирования
 logging.basicConfig(
@@ -44,7 +107,130 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Статичные клавиатуры — собираются один раз при импорте модуля
+MAIN_MENU_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("💰 Эскроу сделки", callback_data='escrow_menu')],
+    [InlineKeyboardButton("📊 Криптоаналитика", callback_data='crypto_menu')],
+    [InlineKeyboardButton("👤 Мой профиль", callback_data='my_profile')],
+    [InlineKeyboardButton("ℹ️ Справка", callback_data='help')]
+])
+
+ESCROW_MENU_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🆕 Создать сделку", callback_data='create_escrow')],
+    [InlineKeyboardButton("✅ Подтвердить сделку", callback_data='confirm_escrow')],
+    [InlineKeyboardButton("📋 Мои сделки", callback_data='my_transactions')],
+    [InlineKeyboardButton("🔍 Статус сделки", callback_data='check_transaction')],
+    [InlineKeyboardButton("⬅️ Назад", callback_data='back_to_main')]
+])
+
+# Мелкие статичные клавиатуры «назад/отмена/повтор» — создаются один раз
+CANCEL_ESCROW_MARKUP = InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Отмена", callback_data='escrow_menu')]])
+BACK_ESCROW_MARKUP = InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Назад", callback_data='escrow_menu')]])
+BACK_MAIN_MARKUP = InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Назад", callback_data='back_to_main')]])
+BACK_CRYPTO_MARKUP = InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Назад к анализу", callback_data='crypto_menu')]])
+BACK_FUNDING_MARKUP = InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Назад к funding", callback_data='funding_rates_menu')]])
+BACK_LONGSHORT_MARKUP = InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Назад к long/short", callback_data='longshort_menu')]])
+BACK_TO_ESCROW_ROW = [InlineKeyboardButton("⬅️ Назад к эскроу", callback_data='escrow_menu')]
+RETRY_HOME_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🔄 Попробовать снова", callback_data='confirm_escrow')],
+    [InlineKeyboardButton("🏠 Главная", callback_data='back_to_main')]
+])
+
+# Неизменные тексты меню и приветствия
+WELCOME_TEXT_TAIL = (
+    "🔐 <b>Эскроу сделки</b> - безопасные P2P сделки с USDT на TRON\n"
+    "📈 <b>Криптоаналитика</b> - данные с бирж и индексы рынка\n\n"
+    "Выберите нужный раздел:"
+)
+
+CRYPTO_MENU_TEXT = (
+    "📊 <b>Криптоаналитика</b>\n\n"
+    "🔸 <b>Графики монет</b> - 20 криптовалют, 6 таймфреймов\n"
+    "🔸 <b>BTC Dominance</b> - доминация Bitcoin\n"
+    "🔸 <b>Fear & Greed</b> - индекс страха и жадности\n"
+    "🔸 <b>Фондовые индексы</b> - S&P 500, NASDAQ и др.\n"
+    "🔸 <b>Funding Rates</b> - ставки финансирования\n"
+    "🔸 <b>Long/Short Ratio</b> - соотношения позиций\n\n"
+    "Выберите категорию:"
+)
+
+HELP_TEXT = (
+    "ℹ️ <b>Справка по боту</b>\n\n"
+    "<b>💰 Эскроу сделки:</b>\n"
+    "• Безопасные P2P сделки с USDT\n"
+    "• Используется смарт-контракт на TRON\n"
+    "• Интеграция с TronLink кошельком\n\n"
+    "<b>📊 Криптоаналитика:</b>\n"
+    "• Bitcoin доминация (CoinGecko)\n"
+    "• Данные по Ethereum (Binance)\n"
+    "• Fear & Greed Index\n"
+    "• Фондовые индексы (Yahoo Finance)\n"
+    "• Funding rates (Binance, Bybit)\n"
+    "• Long/Short соотношения\n\n"
+    "<b>🔒 Безопасность:</b>\n"
+    "• Боту не передаются приватные ключи\n"
+    "• Подписание через TronLink\n"
+    "• Данные хранятся локально\n\n"
+    "❓ Вопросы? Свяжитесь с администратором."
+)
+
+# Шаблоны итоговых сообщений: статическая часть собирается один раз,
+# на каждый запрос подставляются только значения через format_map
+# Отображение статусов контракта (константа модуля — не пересоздаем словарь в хендлере)
+_STATE_DISPLAY = {
+    'AWAITING_PAYMENT': '🔄 Ожидание оплаты',
+    'COMPLETE': '✅ Уже завершена',
+    'REFUNDED': '🔙 Возвращена',
+    'DISPUTED': '⚠️ В споре'
+}
+
+_ESCROW_READY_TMPL = (
+    "✅ <b>Escrow сделка готова!</b>\n\n"
+    "🆔 ID: <code>{tx_id}</code>\n"
+    "📨 Получатель: <code>{recipient}</code>\n"
+    "💰 Сумма: {amount} USDT\n\n"
+    "📋 <b>Дальше:</b>\n"
+    "1. Нажмите 'Подписать через TronLink'\n"
+    "2. Откроется браузер с интерфейсом\n"
+    "3. Подтвердите транзакцию в TronLink\n\n"
+    "⚠️ Убедитесь, что TronLink установлен и разблокирован!"
+)
+_CONFIRM_READY_TMPL = (
+    "✅ <b>Ссылка подтверждения готова!</b>\n\n"
+    "🔢 Transaction ID: <code>{tx_id}</code>\n"
+    "{amount_info}"
+    "{recipient_info}\n"
+    "📋 <b>Дальше:</b>\n"
+    "1. Нажмите 'Подтвердить через TronLink'\n"
+    "2. Откроется браузер с интерфейсом\n"
+    "3. Подтвердите транзакцию в TronLink\n\n"
+    "⚠️ <b>ВНИМАНИЕ:</b> Подтверждайте только \n"
+    "после получения товара/услуги!"
+)
+
+CRYPTO_MENU_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("📈 Графики монет", callback_data='coins_chart_menu')],
+    [InlineKeyboardButton("₿ BTC Dominance", callback_data='btc_dominance')],
+    [InlineKeyboardButton("🔥 Fear & Greed", callback_data='fear_greed')],
+    [InlineKeyboardButton("📊 Фондовые индексы", callback_data='stock_indexes')],
+    [InlineKeyboardButton("💹 Funding Rates", callback_data='funding_rates_menu')],
+    [InlineKeyboardButton("⚖️ Long/Short Ratio", callback_data='longshort_menu')],
+    [InlineKeyboardButton("⬅️ Назад", callback_data='back_to_main')]
+])
+
 # Конфигурация
+@functools.lru_cache(maxsize=1)
+def _load_config_file():
+    """Разовое чтение и парсинг config.json — повторные Config() берут кэш"""
+    try:
+        if os.path.exists(_CONFIG_PATH):
+            with open(_CONFIG_PATH, 'r', encoding='utf-8') as f:
+                return json.load(f)
+    except Exception as e:
+        logger.error(f"Ошибка загрузки конфигурации: {e}")
+    return {}
+
+
 class Config:
     def __init__(self):
         self.config = self.load_config()
@@ -63,94 +249,263 @@ class Config:
         self.ARBITRATOR_ADDRESS = network_config.get('arbitrator_address', "TBohEWSnePeDFd7k3wn3gKdcP8eTv1vzv2")
         
         # Файлы для хранения данных (в папке bots)
-        bots_dir = os.path.dirname(__file__)
-        self.USERS_DATA_FILE = os.path.join(bots_dir, "users_data.json")
-        self.PENDING_TRANSACTIONS_FILE = os.path.join(bots_dir, "pending_transactions.json")
+        self.USERS_DATA_FILE = _USERS_JSON
+        self.PENDING_TRANSACTIONS_FILE = _PENDING_JSON
         
         # URL для TronLink интеграции
         self.WEB_APP_URL = self.config.get('bot', {}).get('web_app_url', "https://goodelita1.github.io/tron-escrow-interface/tronlink_interface.html")
+
+        # Тексты меню с полями конфига неизменны после загрузки —
+        # собираем их один раз, а не на каждом callback'е
+        self.ESCROW_MENU_TEXT = (
+            "💰 <b>Эскроу сделки</b>\n\n"
+            f"🌐 Сеть: {self.NETWORK}\n"
+            f"📋 Контракт: <code>{self.ESCROW_CONTRACT}</code>\n"
+            f"⚖️ Арбитр: <code>{self.ARBITRATOR_ADDRESS}</code>\n\n"
+            "Выберите действие:"
+        )
         
     def load_config(self):
-        """Загрузка конфигурации из JSON файла"""
-        try:
-            config_path = os.path.join(os.path.dirname(__file__), '..', 'config.json')
-            if os.path.exists(config_path):
-                with open(config_path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-        except Exception as e:
-            logger.error(f"Ошибка загрузки конфигурации: {e}")
-        return {}
+        """Загрузка конфигурации из JSON файла (парсится один раз на процесс)"""
+        return _load_config_file()
 
 class UnifiedCryptoBot:
     # ================== КРИПТОВАЛЮТЫ И КОНСТАНТЫ ==================
-    COINS = {
+    # Замороженный словарь: структура не меняется в рантайме
+    COINS = MappingProxyType({
         "eth": "ETHUSDT", "btc": "BTCUSDT", "sol": "SOLUSDT", "xrp": "XRPUSDT",
         "ldo": "LDOUSDT", "atom": "ATOMUSDT", "uni": "UNIUSDT", "near": "NEARUSDT",
         "ltc": "LTCUSDT", "link": "LINKUSDT", "dot": "DOTUSDT", "doge": "DOGEUSDT",
         "avax": "AVAXUSDT", "ape": "APEUSDT", "ada": "ADAUSDT", "op": "OPUSDT",
         "arb": "ARBUSDT", "pol": "POLUSDT", "trx": "TRXUSDT", "bch": "BCHUSDT"
-    }
-    
+    })
+
+    # Пары (coin, COIN) посчитаны один раз — без .upper() при сборке меню
+    _COINS_ITEMS = tuple((coin, coin.upper()) for coin in COINS)
+
+    # Интервалы — строковые литералы Binance API (значения Client.KLINE_INTERVAL_*);
+    # так не нужен импорт binance.client при старте бота
     TIMEFRAMES = {
-        "15m": (Client.KLINE_INTERVAL_15MINUTE, "15 минут"),
-        "1h": (Client.KLINE_INTERVAL_1HOUR, "1 час"),
-        "4h": (Client.KLINE_INTERVAL_4HOUR, "4 часа"), 
-        "1d": (Client.KLINE_INTERVAL_1DAY, "1 день"),
-        "1w": (Client.KLINE_INTERVAL_1WEEK, "1 неделя"),
-        "1m": (Client.KLINE_INTERVAL_1MONTH, "1 месяц")
+        "15m": ("15m", "15 минут"),
+        "1h": ("1h", "1 час"),
+        "4h": ("4h", "4 часа"),
+        "1d": ("1d", "1 день"),
+        "1w": ("1w", "1 неделя"),
+        "1m": ("1M", "1 месяц")
     }
     
     def __init__(self):
         self.config = Config()
+        self.db_path = _DB_PATH
+        # Стек состояний для навигации; TTL вытесняет брошенные сценарии через 10 минут
+        self.user_states = TTLCache(maxsize=10_000, ttl=600) if TTLCache is not None else {}
+        self._conn = None  # Одно долгоживущее соединение с БД
+        self._db_lock = threading.Lock()
+        self.init_db()
+        # Данные пользователей и ожидающие транзакции теперь живут в SQLite
         self.users_data = self.load_users_data()
         self.pending_transactions = self.load_pending_transactions()
-        self.db_path = os.path.join(os.path.dirname(__file__), 'unified_escrow.db')
-        self.user_states = {}  # Добавляем стек состояний для навигации
-        self.init_db()
+        # Вторичный индекс pending-транзакций по пользователю: листинг в
+        # my_transactions_handler становится O(1) вместо обхода всего словаря
+        self._pending_by_user = defaultdict(dict)
+        for tx_uuid, tx_data in self.pending_transactions.items():
+            self._pending_by_user[tx_data.get('user_id')][tx_uuid] = tx_data
+        # Кэш клавиатур по монетам: COINS не меняется, пересобирать их на каждый callback незачем
+        self._coins_chart_markup = self._build_coins_markup('coin')
+        self._funding_markup = self._build_coins_markup('funding')
+        self._longshort_markup = self._build_coins_markup('longshort')
+        self._timeframes_markups = {coin: self._build_timeframes_markup(coin) for coin in self.COINS}
+        self._back_to_coin_markups = {
+            coin: InlineKeyboardMarkup([[InlineKeyboardButton(f"⬅️ Назад к {upper}", callback_data=f'coin_{coin}')]])
+            for coin, upper in self._COINS_ITEMS
+        }
+        # TTL-кэш ответов внешних API + локи для защиты от "thundering herd"
+        self._api_cache = {}
+        self._api_locks = {}
+        # Короткий кэш проверок статуса: спам по кнопке "Проверить статус"
+        # не превращается в дубликаты RPC к ноде. TTLCache выселяет устаревшие
+        # uuid сам — словарь не растет по записи на каждую проверенную сделку
+        self._tx_status_cache = TTLCache(maxsize=1024, ttl=5) if TTLCache is not None else {}
+        self._tx_status_locks = {}
+        # Ленивый read-only клиент TRON — его создание парсит ключ и ходит в сеть
+        self._readonly_client = None
+        self._readonly_client_lock = threading.Lock()
+        # Диспетчеризация "монетных" callback'ов по префиксу вместо цепочки startswith
+        self._coin_handlers = {
+            'coin': self.coin_timeframes_handler,
+            'chart': self.chart_handler,
+            'funding': self.funding_coin_handler,
+            'longshort': self.longshort_coin_handler,
+        }
+        # Точные callback'и: O(1) поиск по словарю вместо цепочки elif-сравнений
+        self._cb_handlers = {
+            'back_to_main': self.back_to_main_handler,
+            'my_profile': self.my_profile_handler,
+            'help': self.help_handler,
+            'crypto_menu': self.crypto_menu,
+            'create_escrow': self.create_escrow_handler,
+            'confirm_escrow': self.confirm_escrow_handler,
+            'my_transactions': self.my_transactions_handler,
+            'escrow_menu': self._escrow_menu_with_reset,
+            'btc_dominance': self.btc_dominance_handler,
+            'fear_greed': self.fear_greed_handler,
+            'stock_indexes': self.stock_indexes_handler,
+            'coins_chart_menu': self.coins_chart_menu_handler,
+            'funding_rates_menu': self.funding_rates_menu_handler,
+            'longshort_menu': self.longshort_menu_handler,
+        }
 
     def load_users_data(self):
-        """Загрузка данных пользователей"""
+        """Загрузка данных пользователей из SQLite (с разовой миграцией из JSON)"""
         try:
-            if os.path.exists(self.config.USERS_DATA_FILE):
-                with open(self.config.USERS_DATA_FILE, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+            self._migrate_legacy_json()
+            with self._db_lock:
+                cur = self.get_db_conn().cursor()
+                cur.execute("SELECT id, data FROM users WHERE data IS NOT NULL")
+                users = {row[0]: _json_loads(row[1]) for row in cur.fetchall()}
+            # Конвертируем старые isoformat-строки в целые timestamp'ы
+            for user_data in users.values():
+                created = user_data.get('created_at')
+                if isinstance(created, str):
+                    try:
+                        user_data['created_at'] = int(datetime.fromisoformat(created).timestamp())
+                    except ValueError:
+                        user_data['created_at'] = 0
+            return users
         except Exception as e:
             logger.error(f"Ошибка загрузки данных пользователей: {e}")
         return {}
-    
-    def save_users_data(self):
-        """Сохранение данных пользователей"""
+
+    def save_users_data(self, user_id: str = None):
+        """Сохранение данных пользователей (только изменённую строку, если указан user_id)"""
         try:
-            with open(self.config.USERS_DATA_FILE, 'w', encoding='utf-8') as f:
-                json.dump(self.users_data, f, ensure_ascii=False, indent=2)
+            if user_id is not None:
+                changed = {user_id: self.users_data.get(user_id)}
+            else:
+                changed = self.users_data
+            with self._db_lock, self.get_db_conn() as conn:
+                cur = conn.cursor()
+                for uid, data in changed.items():
+                    cur.execute("""
+                        INSERT INTO users (id, data) VALUES (?, ?)
+                        ON CONFLICT(id) DO UPDATE SET data = excluded.data
+                    """, (uid, _json_dumps(data)))
+                conn.commit()
         except Exception as e:
             logger.error(f"Ошибка сохранения данных пользователей: {e}")
-    
+
     def load_pending_transactions(self):
-        """Загрузка ожидающих транзакций"""
+        """Загрузка ожидающих транзакций из SQLite"""
         try:
-            if os.path.exists(self.config.PENDING_TRANSACTIONS_FILE):
-                with open(self.config.PENDING_TRANSACTIONS_FILE, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+            with self._db_lock:
+                cur = self.get_db_conn().cursor()
+                cur.execute("SELECT uuid, user_id, created_at, status, data FROM pending_transactions")
+                return {
+                    row[0]: {
+                        'user_id': row[1],
+                        'created_at': row[2],
+                        'status': row[3],
+                        'data': _json_loads(row[4]) if row[4] else {}
+                    }
+                    for row in cur.fetchall()
+                }
         except Exception as e:
             logger.error(f"Ошибка загрузки ожидающих транзакций: {e}")
         return {}
-    
-    def save_pending_transactions(self):
-        """Сохранение ожидающих транзакций"""
+
+    def save_pending_transactions(self, tx_uuid: str = None):
+        """Сохранение ожидающих транзакций (только изменённую строку, если указан tx_uuid)"""
         try:
-            with open(self.config.PENDING_TRANSACTIONS_FILE, 'w', encoding='utf-8') as f:
-                json.dump(self.pending_transactions, f, ensure_ascii=False, indent=2)
+            if tx_uuid is not None:
+                changed = {tx_uuid: self.pending_transactions.get(tx_uuid)}
+            else:
+                changed = dict(self.pending_transactions)
+            with self._db_lock, self.get_db_conn() as conn:
+                cur = conn.cursor()
+                for uuid_key, tx_data in changed.items():
+                    if tx_data is None:
+                        cur.execute("DELETE FROM pending_transactions WHERE uuid = ?", (uuid_key,))
+                        continue
+                    cur.execute("""
+                        INSERT INTO pending_transactions (uuid, user_id, created_at, status, data)
+                        VALUES (?, ?, ?, ?, ?)
+                        ON CONFLICT(uuid) DO UPDATE SET
+                            user_id = excluded.user_id,
+                            created_at = excluded.created_at,
+                            status = excluded.status,
+                            data = excluded.data
+                    """, (
+                        uuid_key,
+                        tx_data.get('user_id'),
+                        tx_data.get('created_at', 0),
+                        tx_data.get('status', 'unknown'),
+                        _json_dumps(tx_data.get('data', {}))
+                    ))
+                conn.commit()
         except Exception as e:
             logger.error(f"Ошибка сохранения ожидающих транзакций: {e}")
 
+    def _migrate_legacy_json(self):
+        """Разовый перенос users_data.json / pending_transactions.json в SQLite"""
+        for path, table in ((self.config.USERS_DATA_FILE, 'users'),
+                            (self.config.PENDING_TRANSACTIONS_FILE, 'pending_transactions')):
+            if not os.path.exists(path):
+                continue
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    legacy = json.load(f)
+                with self._db_lock, self.get_db_conn() as conn:
+                    cur = conn.cursor()
+                    for key, value in legacy.items():
+                        if table == 'users':
+                            cur.execute("""
+                                INSERT INTO users (id, data) VALUES (?, ?)
+                                ON CONFLICT(id) DO UPDATE SET data = excluded.data
+                            """, (key, _json_dumps(value)))
+                        else:
+                            cur.execute("""
+                                INSERT OR REPLACE INTO pending_transactions (uuid, user_id, created_at, status, data)
+                                VALUES (?, ?, ?, ?, ?)
+                            """, (key, value.get('user_id'), value.get('created_at', 0),
+                                  value.get('status', 'unknown'),
+                                  _json_dumps(value.get('data', {}))))
+                    conn.commit()
+                os.rename(path, path + '.migrated')
+                logger.info(f"Данные из {os.path.basename(path)} перенесены в SQLite")
+            except Exception as e:
+                logger.error(f"Ошибка миграции {path}: {e}")
+
     def get_db_conn(self):
-        return sqlite3.connect(self.db_path, check_same_thread=False)
+        # Переиспользуем одно соединение: повторные sqlite3.connect()
+        # на каждый запрос заново читают заголовок и схему БД
+        if self._conn is None:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            # Настройки для каждого соединения (journal_mode=WAL сохраняется в самой БД)
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn = conn
+        return self._conn
+
+    def close(self):
+        """Закрытие ресурсов при остановке бота (вызывается из post_shutdown)"""
+        with self._db_lock:
+            if self._conn is not None:
+                try:
+                    self._conn.close()
+                except Exception as e:
+                    logger.error(f"Ошибка закрытия соединения с БД: {e}")
+                self._conn = None
 
     def init_db(self):
         try:
-            with self.get_db_conn() as conn:
+            with self._db_lock, self.get_db_conn() as conn:
                 cur = conn.cursor()
+                # WAL-режим: читатели не блокируются писателями, меньше fsync
+                cur.execute("PRAGMA journal_mode=WAL")
+                cur.execute("PRAGMA synchronous=NORMAL")
+                cur.execute("PRAGMA temp_store=MEMORY")
+                cur.execute("PRAGMA cache_size=-20000")
+                cur.execute("PRAGMA mmap_size=268435456")
                 cur.execute("""
                     CREATE TABLE IF NOT EXISTS users (
                         id TEXT PRIMARY KEY,
@@ -171,16 +526,32 @@ class UnifiedCryptoBot:
                         uuid TEXT UNIQUE
                     )
                 """)
+                cur.execute("""
+                    CREATE TABLE IF NOT EXISTS pending_transactions (
+                        uuid TEXT PRIMARY KEY,
+                        user_id TEXT,
+                        created_at INTEGER,
+                        status TEXT,
+                        data TEXT
+                    )
+                """)
+                cur.execute("CREATE INDEX IF NOT EXISTS idx_pending_user ON pending_transactions(user_id)")
                 cur.execute("CREATE INDEX IF NOT EXISTS idx_transactions_user ON transactions(user_id)")
-                
-                # Миграция: добавляем колонку uuid если её нет
-                try:
+
+                # Миграции: проверяем схему через PRAGMA вместо
+                # ALTER TABLE + перехвата исключения на каждом старте
+                cur.execute("PRAGMA table_info(transactions)")
+                tx_columns = {row[1] for row in cur.fetchall()}
+                if 'uuid' not in tx_columns:
                     cur.execute("ALTER TABLE transactions ADD COLUMN uuid TEXT UNIQUE")
                     logger.info("Добавлена колонка uuid в таблицу transactions")
-                except sqlite3.OperationalError:
-                    # Колонка уже существует
-                    pass
-                
+
+                cur.execute("PRAGMA table_info(users)")
+                user_columns = {row[1] for row in cur.fetchall()}
+                if 'data' not in user_columns:
+                    cur.execute("ALTER TABLE users ADD COLUMN data TEXT")
+                    logger.info("Добавлена колонка data в таблицу users")
+
                 cur.execute("CREATE INDEX IF NOT EXISTS idx_transactions_uuid ON transactions(uuid)")
                 conn.commit()
         except Exception as e:
@@ -188,7 +559,7 @@ class UnifiedCryptoBot:
 
     def db_upsert_user(self, user_id: str, username: str, first_name: str):
         try:
-            with self.get_db_conn() as conn:
+            with self._db_lock, self.get_db_conn() as conn:
                 cur = conn.cursor()
                 cur.execute("""
                     INSERT INTO users (id, username, first_name, created_at)
@@ -203,22 +574,84 @@ class UnifiedCryptoBot:
     
     def db_add_transaction(self, user_id: str, tx_id: int, amount_usdt: float, recipient: str, role: str, status: str, created_at: int, uuid: str = None):
         """Добавление транзакции в БД с UUID"""
+        self.db_add_transactions_bulk([(tx_id, user_id, amount_usdt, recipient, status, role, created_at, uuid)])
+
+    def db_add_transactions_bulk(self, rows):
+        """Добавление нескольких транзакций одним BEGIN IMMEDIATE ... COMMIT
+
+        rows: список кортежей (id, user_id, amount_usdt, recipient, status, role, created_at, uuid)
+        """
+        if not rows:
+            return
         try:
-            with self.get_db_conn() as conn:
+            with self._db_lock:
+                conn = self.get_db_conn()
                 cur = conn.cursor()
-                cur.execute("""
-                    INSERT OR REPLACE INTO transactions (id, user_id, amount_usdt, recipient, status, role, created_at, uuid)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """, (tx_id, user_id, amount_usdt, recipient, status, role, created_at, uuid))
-                conn.commit()
-                logger.info(f"Транзакция добавлена в БД: blockchain_id={tx_id}, uuid={uuid}")
+                cur.execute("BEGIN IMMEDIATE")
+                try:
+                    # ON CONFLICT DO UPDATE обновляет строку на месте;
+                    # INSERT OR REPLACE удалял её и перестраивал индексы
+                    cur.executemany("""
+                        INSERT INTO transactions (id, user_id, amount_usdt, recipient, status, role, created_at, uuid)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                        ON CONFLICT(id) DO UPDATE SET
+                            user_id = excluded.user_id,
+                            amount_usdt = excluded.amount_usdt,
+                            recipient = excluded.recipient,
+                            status = excluded.status,
+                            role = excluded.role,
+                            created_at = excluded.created_at,
+                            uuid = excluded.uuid
+                    """, rows)
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                for row in rows:
+                    logger.info(f"Транзакция добавлена в БД: blockchain_id={row[0]}, uuid={row[7]}")
         except Exception as e:
-            logger.error(f"Ошибка добавления транзакции в БД: {e}")
-    
+            logger.error(f"Ошибка добавления транзакций в БД: {e}")
+
+    def db_promote_pending(self, row, tx_uuid: str):
+        """Атомарный перенос pending-транзакции в подтвержденные
+
+        Вставка в transactions и удаление из pending_transactions идут одним
+        BEGIN IMMEDIATE ... COMMIT: один fsync вместо двух, и при сбое
+        обе таблицы остаются согласованными.
+        """
+        try:
+            with self._db_lock:
+                conn = self.get_db_conn()
+                cur = conn.cursor()
+                cur.execute("BEGIN IMMEDIATE")
+                try:
+                    cur.execute("""
+                        INSERT INTO transactions (id, user_id, amount_usdt, recipient, status, role, created_at, uuid)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                        ON CONFLICT(id) DO UPDATE SET
+                            user_id = excluded.user_id,
+                            amount_usdt = excluded.amount_usdt,
+                            recipient = excluded.recipient,
+                            status = excluded.status,
+                            role = excluded.role,
+                            created_at = excluded.created_at,
+                            uuid = excluded.uuid
+                    """, row)
+                    cur.execute("DELETE FROM pending_transactions WHERE uuid = ?", (tx_uuid,))
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                logger.info(f"Транзакция добавлена в БД: blockchain_id={row[0]}, uuid={tx_uuid}")
+                return True
+        except Exception as e:
+            logger.error(f"Ошибка переноса pending транзакции в БД: {e}")
+            return False
+
     def db_get_transaction_by_uuid(self, uuid: str):
         """Получение транзакции по UUID"""
         try:
-            with self.get_db_conn() as conn:
+            with self._db_lock, self.get_db_conn() as conn:
                 cur = conn.cursor()
                 cur.execute("""
                     SELECT id, user_id, amount_usdt, recipient, status, role, created_at, uuid 
@@ -234,10 +667,20 @@ class UnifiedCryptoBot:
             logger.error(f"Ошибка поиска транзакции по UUID: {e}")
             return None
     
+    def db_update_transaction_status(self, uuid: str, status: str):
+        """Обновление только статуса транзакции — без перезаписи всей строки"""
+        try:
+            with self._db_lock, self.get_db_conn() as conn:
+                cur = conn.cursor()
+                cur.execute("UPDATE transactions SET status = ? WHERE uuid = ?", (status, uuid))
+                conn.commit()
+        except Exception as e:
+            logger.error(f"Ошибка обновления статуса транзакции: {e}")
+
     def db_update_transaction_mapping(self, uuid: str, blockchain_id: int):
         """Обновление связи UUID -> blockchain_id"""
         try:
-            with self.get_db_conn() as conn:
+            with self._db_lock, self.get_db_conn() as conn:
                 cur = conn.cursor()
                 cur.execute("""
                     UPDATE transactions SET id = ? WHERE uuid = ?
@@ -247,103 +690,80 @@ class UnifiedCryptoBot:
         except Exception as e:
             logger.error(f"Ошибка обновления связи: {e}")
 
+    def _fetch_user_txs_sync(self, user_id: str):
+        """Синхронная выборка сделок пользователя (вызывается через asyncio.to_thread)
+
+        Выбираем только отображаемые колонки и ограничиваем выборку на стороне SQL —
+        показываются всё равно максимум 5 строк.
+        """
+        with self._db_lock, self.get_db_conn() as conn:
+            cur = conn.cursor()
+            cur.execute("""
+                SELECT id, amount_usdt, recipient, status, created_at, uuid
+                FROM transactions WHERE user_id = ?
+                ORDER BY created_at DESC LIMIT 5
+            """, (user_id,))
+            return cur.fetchall()
+
+    def _count_user_txs_sync(self, user_id: str):
+        """Синхронный подсчет сделок пользователя (вызывается через asyncio.to_thread)"""
+        with self._db_lock, self.get_db_conn() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT COUNT(*) FROM transactions WHERE user_id = ?", (user_id,))
+            return cur.fetchone()[0]
+
     # ================== ГЛАВНОЕ МЕНЮ ==================
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработчик команды /start с объединенным меню"""
         user = update.effective_user
-        user_id = str(user.id)
+        user_id = sys.intern(str(user.id))
         username = user.username or "неизвестно"
         first_name = user.first_name or "неизвестно"
         
-        # Сохраняем пользователя в БД
-        self.db_upsert_user(user_id, username, first_name)
-        
+        # Сохраняем пользователя в БД — коммит (fsync) уходит в пул потоков,
+        # чтобы не задерживать event loop на каждом /start
+        await asyncio.to_thread(self.db_upsert_user, user_id, username, first_name)
+
         # Сохраняем базовые данные пользователя
         if user_id not in self.users_data:
             self.users_data[user_id] = {
                 'username': username,
                 'first_name': first_name,
-                'created_at': datetime.now().isoformat()
+                'created_at': int(time.time())
             }
-            self.save_users_data()
+            await asyncio.to_thread(self.save_users_data, user_id)
 
-        keyboard = [
-            [InlineKeyboardButton("💰 Эскроу сделки", callback_data='escrow_menu')],
-            [InlineKeyboardButton("📊 Криптоаналитика", callback_data='crypto_menu')],
-            [InlineKeyboardButton("👤 Мой профиль", callback_data='my_profile')],
-            [InlineKeyboardButton("ℹ️ Справка", callback_data='help')]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
+        reply_markup = MAIN_MENU_MARKUP
+
+        # Интерполируется только имя пользователя, хвост — константа.
+        # Имя экранируем: '<' в display name ломает разбор HTML у Telegram
         welcome_text = (
             f"🤖 Добро пожаловать в Unified Crypto Bot!\n\n"
-            f"👋 Привет, {first_name}!\n\n"
-            f"🔐 **Эскроу сделки** - безопасные P2P сделки с USDT на TRON\n"
-            f"📈 **Криптоаналитика** - данные с бирж и индексы рынка\n\n"
-            f"Выберите нужный раздел:"
+            f"👋 Привет, {html.escape(first_name)}!\n\n"
+            + WELCOME_TEXT_TAIL
         )
         
         if update.message:
-            await update.message.reply_text(welcome_text, reply_markup=reply_markup, parse_mode=ParseMode.MARKDOWN)
+            await update.message.reply_text(welcome_text, reply_markup=reply_markup, parse_mode=ParseMode.HTML)
         else:
-            await update.callback_query.edit_message_text(welcome_text, reply_markup=reply_markup, parse_mode=ParseMode.MARKDOWN)
+            await update.callback_query.edit_message_text(welcome_text, reply_markup=reply_markup, parse_mode=ParseMode.HTML)
 
     # ================== ЭСКРОУ МЕНЮ ==================
     async def escrow_menu(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Меню эскроу функций"""
-        keyboard = [
-            [InlineKeyboardButton("🆕 Создать сделку", callback_data='create_escrow')],
-            [InlineKeyboardButton("✅ Подтвердить сделку", callback_data='confirm_escrow')],
-            [InlineKeyboardButton("📋 Мои сделки", callback_data='my_transactions')],
-            [InlineKeyboardButton("🔍 Статус сделки", callback_data='check_transaction')],
-            [InlineKeyboardButton("⬅️ Назад", callback_data='back_to_main')]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        text = (
-            "💰 **Эскроу сделки**\n\n"
-            f"🌐 Сеть: {self.config.NETWORK}\n"
-            f"📋 Контракт: `{self.config.ESCROW_CONTRACT}`\n"
-            f"⚖️ Арбитр: `{self.config.ARBITRATOR_ADDRESS}`\n\n"
-            "Выберите действие:"
-        )
-        
+        reply_markup = ESCROW_MENU_MARKUP
+        text = self.config.ESCROW_MENU_TEXT
+
         query = update.callback_query
         await query.answer()
-        await query.edit_message_text(text, reply_markup=reply_markup, parse_mode=ParseMode.MARKDOWN)
+        await query.edit_message_text(text, reply_markup=reply_markup, parse_mode=ParseMode.HTML)
 
-    # ================== КРИПТОВАЛЮТЫ И КОНСТАНТЫ ==================
-    COINS = {
-        "eth": "ETHUSDT", "btc": "BTCUSDT", "sol": "SOLUSDT", "xrp": "XRPUSDT",
-        "ldo": "LDOUSDT", "atom": "ATOMUSDT", "uni": "UNIUSDT", "near": "NEARUSDT",
-        "ltc": "LTCUSDT", "link": "LINKUSDT", "dot": "DOTUSDT", "doge": "DOGEUSDT",
-        "avax": "AVAXUSDT", "ape": "APEUSDT", "ada": "ADAUSDT", "op": "OPUSDT",
-        "arb": "ARBUSDT", "pol": "POLUSDT", "trx": "TRXUSDT", "bch": "BCHUSDT"
-    }
-    
-    TIMEFRAMES = {
-        "15m": (Client.KLINE_INTERVAL_15MINUTE, "15 минут"),
-        "1h": (Client.KLINE_INTERVAL_1HOUR, "1 час"),
-        "4h": (Client.KLINE_INTERVAL_4HOUR, "4 часа"), 
-        "1d": (Client.KLINE_INTERVAL_1DAY, "1 день"),
-        "1w": (Client.KLINE_INTERVAL_1WEEK, "1 неделя"),
-        "1m": (Client.KLINE_INTERVAL_1MONTH, "1 месяц")
-    }
-    
-    def __init__(self):
-        self.config = Config()
-        self.users_data = self.load_users_data()
-        self.pending_transactions = self.load_pending_transactions()
-        self.db_path = os.path.join(os.path.dirname(__file__), 'unified_escrow.db')
-        self.user_states = {}  # Добавляем стек состояний для навигации
-        self.init_db()
-    
-    def create_coins_menu(self):
-        """Создает меню выбора криптовалют"""
+    def _build_coins_markup(self, prefix):
+        """Собирает сетку монет с callback_data вида '<prefix>_<coin>'"""
         buttons = []
         row = []
-        for i, coin in enumerate(self.COINS, start=1):
-            row.append(InlineKeyboardButton(coin.upper(), callback_data=f'coin_{coin}'))
+        for i, (coin, label) in enumerate(self._COINS_ITEMS, start=1):
+            row.append(InlineKeyboardButton(label, callback_data=f'{prefix}_{coin}'))
             if i % 4 == 0:  # 4 монеты в ряд
                 buttons.append(row)
                 row = []
@@ -351,71 +771,140 @@ class UnifiedCryptoBot:
             buttons.append(row)
         buttons.append([InlineKeyboardButton("⬅️ Назад", callback_data='crypto_menu')])
         return InlineKeyboardMarkup(buttons)
-    
-    def create_timeframes_menu(self, coin):
-        """Создает меню временных интервалов для конкретной монеты"""
+
+    def _build_timeframes_markup(self, coin):
+        """Собирает меню временных интервалов для конкретной монеты"""
         buttons = []
         for tf, (_, label) in self.TIMEFRAMES.items():
             buttons.append([InlineKeyboardButton(label, callback_data=f'chart_{coin}_{tf}')])
         buttons.append([InlineKeyboardButton("⬅️ Назад к монетам", callback_data='coins_chart_menu')])
         return InlineKeyboardMarkup(buttons)
-    
+
+    def create_coins_menu(self):
+        """Меню выбора криптовалют (кэшируется при создании бота)"""
+        return self._coins_chart_markup
+
+    def create_timeframes_menu(self, coin):
+        """Меню временных интервалов для конкретной монеты (кэшируется)"""
+        return self._timeframes_markups[coin]
+
     def create_funding_coins_menu(self):
-        """Создает меню выбора монет для funding rates"""
-        buttons = []
-        row = []
-        for i, coin in enumerate(self.COINS, start=1):
-            row.append(InlineKeyboardButton(coin.upper(), callback_data=f'funding_{coin}'))
-            if i % 4 == 0:
-                buttons.append(row)
-                row = []
-        if row:
-            buttons.append(row)
-        buttons.append([InlineKeyboardButton("⬅️ Назад", callback_data='crypto_menu')])
-        return InlineKeyboardMarkup(buttons)
-        
+        """Меню выбора монет для funding rates (кэшируется)"""
+        return self._funding_markup
+
     def create_longshort_coins_menu(self):
-        """Создает меню выбора монет для long/short ratio"""
-        buttons = []
-        row = []
-        for i, coin in enumerate(self.COINS, start=1):
-            row.append(InlineKeyboardButton(coin.upper(), callback_data=f'longshort_{coin}'))
-            if i % 4 == 0:
-                buttons.append(row)
-                row = []
-        if row:
-            buttons.append(row)
-        buttons.append([InlineKeyboardButton("⬅️ Назад", callback_data='crypto_menu')])
-        return InlineKeyboardMarkup(buttons)
+        """Меню выбора монет для long/short ratio (кэшируется)"""
+        return self._longshort_markup
+
+    def _get_readonly_client(self):
+        """Ленивая инициализация read-only клиента TRON.
+
+        Один клиент на всё время жизни бота: конструктор парсит приватный
+        ключ, выводит адрес и загружает контракты по сети — платить это
+        на каждом запросе незачем, а keep-alive соединение переиспользуется.
+        Конструктор ходит в сеть, поэтому вызывать только через
+        asyncio.to_thread; лок защищает от двойной инициализации из
+        конкурентных обработчиков.
+        """
+        if self._readonly_client is None:
+            with self._readonly_client_lock:
+                if self._readonly_client is None:
+                    from scripts.tron_escrow_usdt_client import TronEscrowUSDTClient
+                    self._readonly_client = TronEscrowUSDTClient(
+                        private_key="0000000000000000000000000000000000000000000000000000000000000001",  # Dummy key для чтения
+                        contract_address=self.config.ESCROW_CONTRACT,
+                        network=self.config.NETWORK
+                    )
+        return self._readonly_client
+
+    async def _probe_pending_in_chain(self, tx_uuid, recipient):
+        """Поиск pending-транзакции среди последних 10 в блокчейне.
+
+        Результат кэшируется на несколько секунд, а конкурентные промахи
+        сливаются в один скан: повторные нажатия "Проверить статус"
+        не порождают дубликаты RPC к ноде.
+        """
+        hit = self._tx_status_cache.get(tx_uuid)
+        if hit and time.monotonic() - hit[0] < 5.0:
+            return hit[1]
+        lock = self._tx_status_locks.setdefault(tx_uuid, asyncio.Lock())
+        async with lock:
+            try:
+                hit = self._tx_status_cache.get(tx_uuid)
+                if hit and time.monotonic() - hit[0] < 5.0:
+                    return hit[1]
+
+                # Переиспользуем read-only клиент; первое создание загружает
+                # контракты по сети, поэтому уводим его в пул потоков
+                temp_client = await asyncio.to_thread(self._get_readonly_client)
+
+                # Получаем общее количество транзакций
+                total_transactions = await asyncio.to_thread(temp_client.get_transaction_count)
+
+                # Ищем среди последних 10 транзакций — опрашиваем их параллельно,
+                # чтобы не платить 10 последовательных round-trip к ноде
+                found_blockchain_id = None
+
+                async def _probe(blockchain_id):
+                    try:
+                        return blockchain_id, await asyncio.to_thread(temp_client.get_transaction, blockchain_id)
+                    except Exception as e:
+                        logger.warning(f"Ошибка при проверке транзакции {blockchain_id}: {e}")
+                        return blockchain_id, None
+
+                probe_ids = range(total_transactions - 1, max(-1, total_transactions - 10), -1)
+                results = await asyncio.gather(*[_probe(i) for i in probe_ids])
+
+                for blockchain_id, tx_info in results:
+                    if not tx_info:
+                        continue
+
+                    blockchain_recipient = tx_info.get('recipient', '')
+                    tx_state = tx_info.get('state', '')
+
+                    # Проверяем совпадение по получателю и статусу AWAITING_DELIVERY
+                    if (blockchain_recipient.lower() == recipient.lower() and
+                        tx_state == 'AWAITING_DELIVERY'):
+                        found_blockchain_id = blockchain_id
+                        break
+
+                self._tx_status_cache[tx_uuid] = (time.monotonic(), found_blockchain_id)
+                return found_blockchain_id
+            finally:
+                # Запись лока убираем и при ошибке RPC: ожидающие уже держат
+                # ссылку на объект, а словарь не копит по локу на uuid
+                self._tx_status_locks.pop(tx_uuid, None)
+
+    async def cached_api_call(self, key, fn, *args, ttl=60):
+        """Вызов внешнего API через TTL-кэш.
+
+        Одновременные нажатия одной и той же кнопки сводятся к одному
+        запросу: первый обработчик идет в сеть под локом, остальные
+        получают результат из кэша.
+        """
+        now = time.time()
+        hit = self._api_cache.get(key)
+        if hit and now - hit[0] < ttl:
+            return hit[1]
+        lock = self._api_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            # Перепроверяем после захвата лока: кэш мог уже обновиться
+            hit = self._api_cache.get(key)
+            if hit and time.time() - hit[0] < ttl:
+                return hit[1]
+            result = await asyncio.to_thread(fn, *args)
+            self._api_cache[key] = (time.time(), result)
+            return result
 
     # ================== КРИПТОАНАЛИТИКА МЕНЮ ==================
     async def crypto_menu(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Меню криптоаналитики"""
-        keyboard = [
-            [InlineKeyboardButton("📈 Графики монет", callback_data='coins_chart_menu')],
-            [InlineKeyboardButton("₿ BTC Dominance", callback_data='btc_dominance')],
-            [InlineKeyboardButton("🔥 Fear & Greed", callback_data='fear_greed')],
-            [InlineKeyboardButton("📊 Фондовые индексы", callback_data='stock_indexes')],
-            [InlineKeyboardButton("💹 Funding Rates", callback_data='funding_rates_menu')],
-            [InlineKeyboardButton("⚖️ Long/Short Ratio", callback_data='longshort_menu')],
-            [InlineKeyboardButton("⬅️ Назад", callback_data='back_to_main')]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        text = (
-            "📊 **Криптоаналитика**\n\n"
-            "🔸 **Графики монет** - 20 криптовалют, 6 таймфреймов\n"
-            "🔸 **BTC Dominance** - доминация Bitcoin\n" 
-            "🔸 **Fear & Greed** - индекс страха и жадности\n"
-            "🔸 **Фондовые индексы** - S&P 500, NASDAQ и др.\n"
-            "🔸 **Funding Rates** - ставки финансирования\n"
-            "🔸 **Long/Short Ratio** - соотношения позиций\n\n"
-            "Выберите категорию:"
-        )
-        
+        reply_markup = CRYPTO_MENU_MARKUP
+        text = CRYPTO_MENU_TEXT
+
         query = update.callback_query
         await query.answer()
-        await query.edit_message_text(text, reply_markup=reply_markup, parse_mode=ParseMode.MARKDOWN)
+        await query.edit_message_text(text, reply_markup=reply_markup, parse_mode=ParseMode.HTML)
 
     # ================== ОБРАБОТЧИКИ КРИПТОАНАЛИТИКИ ==================
     async def btc_dominance_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -424,15 +913,16 @@ class UnifiedCryptoBot:
         await query.answer()
         
         try:
-            response = CoinGeko_btc_dominance()
-            text = f"₿ **Bitcoin Dominance**\n\n{response}"
+            from crypto_api.coingeko_api.coingekoApi import CoinGeko_btc_dominance
+            # Доминация меняется медленно; длинный TTL бережет лимиты CoinGecko
+            response = await self.cached_api_call('btc_dominance', CoinGeko_btc_dominance, ttl=300)
+            text = f"₿ <b>Bitcoin Dominance</b>\n\n{response}"
         except Exception as e:
             text = f"❌ Ошибка получения данных: {e}"
         
         # Добавляем кнопку назад
-        keyboard = [[InlineKeyboardButton("⬅️ Назад к анализу", callback_data='crypto_menu')]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        await query.edit_message_text(text, reply_markup=reply_markup, parse_mode=ParseMode.MARKDOWN)
+        reply_markup = BACK_CRYPTO_MARKUP
+        await query.edit_message_text(text, reply_markup=reply_markup, parse_mode=ParseMode.HTML)
 
     async def fear_greed_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработчик Fear & Greed Index"""
@@ -440,13 +930,14 @@ class UnifiedCryptoBot:
         await query.answer()
         
         try:
-            text = FearGreedAPI.get_index()
+            from crypto_api.alternativeme_api.alternativemeApi import FearGreedAPI
+            # Индекс обновляется раз в сутки — часа кэша более чем достаточно
+            text = await self.cached_api_call('fear_greed', FearGreedAPI.get_index, ttl=3600)
         except Exception as e:
             text = f"❌ Ошибка получения данных: {e}"
         
-        keyboard = [[InlineKeyboardButton("⬅️ Назад к анализу", callback_data='crypto_menu')]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        await query.edit_message_text(text, reply_markup=reply_markup, parse_mode=ParseMode.MARKDOWN)
+        reply_markup = BACK_CRYPTO_MARKUP
+        await query.edit_message_text(text, reply_markup=reply_markup, parse_mode=ParseMode.HTML)
 
     async def stock_indexes_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработчик фондовых индексов"""
@@ -454,14 +945,14 @@ class UnifiedCryptoBot:
         await query.answer()
         
         try:
-            response = Yfinance_get_index_stats('1d')
-            text = f"📊 **Фондовые индексы (1 день)**\n\n{response}"
+            from crypto_api.yfinance_api.yfinanceApi import Yfinance_get_index_stats
+            response = await self.cached_api_call('stock_indexes_1d', Yfinance_get_index_stats, '1d', ttl=300)
+            text = f"📊 <b>Фондовые индексы (1 день)</b>\n\n{response}"
         except Exception as e:
             text = f"❌ Ошибка получения данных: {e}"
         
-        keyboard = [[InlineKeyboardButton("⬅️ Назад к анализу", callback_data='crypto_menu')]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        await query.edit_message_text(text, reply_markup=reply_markup, parse_mode=ParseMode.MARKDOWN)
+        reply_markup = BACK_CRYPTO_MARKUP
+        await query.edit_message_text(text, reply_markup=reply_markup, parse_mode=ParseMode.HTML)
 
     # ================== FUNDING RATES ДЛЯ ВСЕХ МОНЕТ ==================
     async def funding_rates_menu_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -470,45 +961,56 @@ class UnifiedCryptoBot:
         await query.answer()
         
         text = (
-            "💹 **Funding Rates**\n\n"
+            "💹 <b>Funding Rates</b>\n\n"
             "🔸 Данные с Binance и Bybit\n"
             "🔸 20 криптовалют доступны\n\n"
             "Выберите монету:"
         )
         
         reply_markup = self.create_funding_coins_menu()
-        await query.edit_message_text(text, reply_markup=reply_markup, parse_mode=ParseMode.MARKDOWN)
+        await query.edit_message_text(text, reply_markup=reply_markup, parse_mode=ParseMode.HTML)
     
     async def funding_coin_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработчик funding rate для конкретной монеты"""
         query = update.callback_query
         data = query.data
-        coin = data.split('_')[1]  # funding_btc -> btc
+        _, _, coin = data.partition('_')  # funding_btc -> btc
         
         await query.answer()
         
-        if coin not in self.COINS:
+        # Один поиск по словарю вместо membership-проверки и повторного доступа
+        symbol = self.COINS.get(coin)
+        if symbol is None:
             await query.edit_message_text("❌ Неизвестная монета")
             return
         
         try:
-            symbol = self.COINS[coin]
-            
-            # Получаем данные с обеих бирж
-            binance_result = get_binance_funding_rate(symbol, 1)
-            bybit_result = get_funding_rate(symbol)
-            
+            from crypto_api.binance_api.binanceApi import get_binance_funding_rate
+            from crypto_api.bybit_api.bybitApi import get_funding_rate
+
+            # Получаем данные с обеих бирж параллельно — каждая это HTTPS round-trip
+            # Funding на биржах пересчитывается раз в 8 часов — часа кэша достаточно
+            binance_result, bybit_result = await asyncio.gather(
+                self.cached_api_call(f'funding_binance_{symbol}', get_binance_funding_rate, symbol, 1, ttl=3600),
+                self.cached_api_call(f'funding_bybit_{symbol}', get_funding_rate, symbol, ttl=3600),
+                return_exceptions=True
+            )
+            # Ошибка одной биржи не должна скрывать данные другой
+            if isinstance(binance_result, Exception):
+                binance_result = f"❌ Ошибка: {binance_result}"
+            if isinstance(bybit_result, Exception):
+                bybit_result = f"❌ Ошибка: {bybit_result}"
+
             text = (
-                f"💹 **{coin.upper()} Funding Rates**\n\n"
-                f"🔸 **Binance:**\n{binance_result}\n\n"
-                f"🔸 **Bybit:**\n{bybit_result}"
+                f"💹 <b>{coin.upper()} Funding Rates</b>\n\n"
+                f"🔸 <b>Binance:</b>\n{binance_result}\n\n"
+                f"🔸 <b>Bybit:</b>\n{bybit_result}"
             )
         except Exception as e:
             text = f"❌ Ошибка получения данных: {e}"
         
-        keyboard = [[InlineKeyboardButton("⬅️ Назад к funding", callback_data='funding_rates_menu')]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        await query.edit_message_text(text, reply_markup=reply_markup, parse_mode=ParseMode.MARKDOWN)
+        reply_markup = BACK_FUNDING_MARKUP
+        await query.edit_message_text(text, reply_markup=reply_markup, parse_mode=ParseMode.HTML)
     
     # ================== LONG/SHORT RATIO ДЛЯ ВСЕХ МОНЕТ ==================
     async def longshort_menu_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -517,40 +1019,40 @@ class UnifiedCryptoBot:
         await query.answer()
         
         text = (
-            "⚖️ **Long/Short Ratio**\n\n"
+            "⚖️ <b>Long/Short Ratio</b>\n\n"
             "🔸 Данные с Bybit\n"
             "🔸 20 криптовалют доступны\n\n"
             "Выберите монету:"
         )
         
         reply_markup = self.create_longshort_coins_menu()
-        await query.edit_message_text(text, reply_markup=reply_markup, parse_mode=ParseMode.MARKDOWN)
+        await query.edit_message_text(text, reply_markup=reply_markup, parse_mode=ParseMode.HTML)
     
     async def longshort_coin_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработчик long/short ratio для конкретной монеты"""
         query = update.callback_query
         data = query.data
-        coin = data.split('_')[1]  # longshort_btc -> btc
+        _, _, coin = data.partition('_')  # longshort_btc -> btc
         
         await query.answer()
         
-        if coin not in self.COINS:
+        symbol = self.COINS.get(coin)
+        if symbol is None:
             await query.edit_message_text("❌ Неизвестная монета")
             return
         
         try:
-            symbol = self.COINS[coin]
-            
+            from crypto_api.bybit_api.bybitApi import get_long_short_ratio
+
             # Получаем long/short ratio с Bybit
-            response = get_long_short_ratio(symbol, "1h", "linear")
+            response = await self.cached_api_call(f'longshort_{symbol}', get_long_short_ratio, symbol, "1h", "linear")
             
-            text = f"⚖️ **{coin.upper()} Long/Short Ratio**\n\n{response}"
+            text = f"⚖️ <b>{coin.upper()} Long/Short Ratio</b>\n\n{response}"
         except Exception as e:
             text = f"❌ Ошибка получения данных: {e}"
         
-        keyboard = [[InlineKeyboardButton("⬅️ Назад к long/short", callback_data='longshort_menu')]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        await query.edit_message_text(text, reply_markup=reply_markup, parse_mode=ParseMode.MARKDOWN)
+        reply_markup = BACK_LONGSHORT_MARKUP
+        await query.edit_message_text(text, reply_markup=reply_markup, parse_mode=ParseMode.HTML)
 
     # ================== НОВЫЕ ОБРАБОТЧИКИ МОНЕТ ==================
     async def coins_chart_menu_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -559,60 +1061,64 @@ class UnifiedCryptoBot:
         await query.answer()
         
         text = (
-            "📈 **Графики монет**\n\n"
+            "📈 <b>Графики монет</b>\n\n"
             "🔸 20 криптовалют доступны\n"
             "🔸 6 временных интервалов\n\n"
             "Выберите криптовалюту:"
         )
         
         reply_markup = self.create_coins_menu()
-        await query.edit_message_text(text, reply_markup=reply_markup, parse_mode=ParseMode.MARKDOWN)
+        await query.edit_message_text(text, reply_markup=reply_markup, parse_mode=ParseMode.HTML)
     
     async def coin_timeframes_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработчик выбора конкретной монеты"""
         query = update.callback_query
         data = query.data
-        coin = data.split('_')[1]  # coin_eth -> eth
+        _, _, coin = data.partition('_')  # coin_eth -> eth
         
         await query.answer()
         
-        if coin not in self.COINS:
+        symbol = self.COINS.get(coin)
+        if symbol is None:
             await query.edit_message_text("❌ Неизвестная монета")
             return
         
         text = (
-            f"📈 **{coin.upper()} - Графики**\n\n"
-            f"Тикер: `{self.COINS[coin]}`\n\n"
+            f"📈 <b>{coin.upper()} - Графики</b>\n\n"
+            f"Тикер: <code>{symbol}</code>\n\n"
             "Выберите временной интервал:"
         )
         
         reply_markup = self.create_timeframes_menu(coin)
-        await query.edit_message_text(text, reply_markup=reply_markup, parse_mode=ParseMode.MARKDOWN)
+        await query.edit_message_text(text, reply_markup=reply_markup, parse_mode=ParseMode.HTML)
     
     async def chart_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработчик получения графика конкретной монеты"""
         query = update.callback_query
         data = query.data
-        _, coin, timeframe = data.split('_', 2)  # chart_eth_1h -> ['chart', 'eth', '1h']
+        _, _, rest = data.partition('_')  # chart_eth_1h -> eth, 1h
+        coin, _, timeframe = rest.partition('_')
         
         await query.answer()
         
-        if coin not in self.COINS or timeframe not in self.TIMEFRAMES:
+        symbol = self.COINS.get(coin)
+        tf = self.TIMEFRAMES.get(timeframe)
+        if symbol is None or tf is None:
             await query.edit_message_text("❌ Неверные параметры")
             return
         
         try:
-            symbol = self.COINS[coin]
-            interval, timeframe_label = self.TIMEFRAMES[timeframe]
+            from crypto_api.binance_api.binanceApi import Candles_info_binanceApi
+
+            interval, timeframe_label = tf
             
-            response = Candles_info_binanceApi(interval, symbol, 1)
-            text = f"📈 **{coin.upper()} ({timeframe_label})**\n\n{response}"
+            response = await self.cached_api_call(f'chart_{symbol}_{timeframe}', Candles_info_binanceApi, interval, symbol, 1, ttl=30)
+            text = f"📈 <b>{coin.upper()} ({timeframe_label})</b>\n\n{response}"
         except Exception as e:
             text = f"❌ Ошибка получения данных: {e}"
         
-        keyboard = [[InlineKeyboardButton(f"⬅️ Назад к {coin.upper()}", callback_data=f'coin_{coin}')]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        await query.edit_message_text(text, reply_markup=reply_markup, parse_mode=ParseMode.MARKDOWN)
+        reply_markup = self._back_to_coin_markups[coin]
+        await query.edit_message_text(text, reply_markup=reply_markup, parse_mode=ParseMode.HTML)
 
     # ================== ПРОСТЫЕ ЭСКРОУ ФУНКЦИИ (из оригинала) ==================
     async def create_escrow_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -620,8 +1126,10 @@ class UnifiedCryptoBot:
         query = update.callback_query
         await query.answer()
         
-        user_id = str(update.effective_user.id)
-        transaction_id = str(uuid.uuid4())
+        user_id = sys.intern(str(update.effective_user.id))
+        # hex-форма короче дефисной на 4 символа и не тратит время на форматирование,
+        # при этом uuid.UUID() в обработчике ввода по-прежнему её распознает
+        transaction_id = uuid.uuid4().hex
         
         # Сохраняем состояние пользователя
         self.user_states[user_id] = {
@@ -637,24 +1145,24 @@ class UnifiedCryptoBot:
             'status': 'creating',
             'data': {}
         }
-        self.save_pending_transactions()
+        self._pending_by_user[user_id][transaction_id] = self.pending_transactions[transaction_id]
+        await asyncio.to_thread(self.save_pending_transactions, transaction_id)
         
-        keyboard = [[InlineKeyboardButton("⬅️ Отмена", callback_data='escrow_menu')]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = CANCEL_ESCROW_MARKUP
         
         text = (
-            "🆕 **Создание Escrow сделки**\n\n"
-            f"🆔 ID: `{transaction_id}`\n\n"
-            "📨 **Шаг 1/2: Адрес получателя**\n\n"
+            "🆕 <b>Создание Escrow сделки</b>\n\n"
+            f"🆔 ID: <code>{transaction_id}</code>\n\n"
+            "📨 <b>Шаг 1/2: Адрес получателя</b>\n\n"
             "Введите TRON адрес получателя USDT:\n"
             "(Например: TJtq3AVtNTngU23HFinp22rh6Ufcy78Ce4)"
         )
         
-        await query.edit_message_text(text, reply_markup=reply_markup, parse_mode=ParseMode.MARKDOWN)
+        await query.edit_message_text(text, reply_markup=reply_markup, parse_mode=ParseMode.HTML)
 
     async def handle_text_input(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработка текстового ввода пользователя"""
-        user_id = str(update.effective_user.id)
+        user_id = sys.intern(str(update.effective_user.id))
         
         if user_id not in self.user_states:
             return  # Пользователь не в процессе создания сделки
@@ -671,39 +1179,44 @@ class UnifiedCryptoBot:
     
     async def handle_recipient_input(self, update: Update, context: ContextTypes.DEFAULT_TYPE, recipient_address: str):
         """Обработка ввода адреса получателя"""
-        user_id = str(update.effective_user.id)
+        user_id = sys.intern(str(update.effective_user.id))
         
-        # Проверяем формат TRON адреса
-        if not recipient_address.startswith('T') or len(recipient_address) != 34:
+        # Проверяем формат TRON адреса одним проходом компилированного regex
+        if not _TRON_ADDRESS_RE.match(recipient_address):
             await update.message.reply_text(
-                "⚠️ **Некорректный адрес!**\n\n"
+                "⚠️ <b>Некорректный адрес!</b>\n\n"
                 "TRON адрес должен:\n"
                 "• Начинаться с 'T'\n"
-                "• Содержать 34 символа\n\n"
+                "• Содержать 34 символа Base58\n\n"
                 "Повторите попытку:",
-                parse_mode=ParseMode.MARKDOWN
+                parse_mode=ParseMode.HTML
             )
             return
         
+        # Снимок состояния одним get: TTL-кэш мог выселить запись после
+        # проверки в handle_text_input, голое индексирование упадет с KeyError
+        user_state = self.user_states.get(user_id)
+        if user_state is None:
+            return
+
         # Сохраняем адрес и переходим к следующему шагу
-        self.user_states[user_id]['data']['recipient'] = recipient_address
-        self.user_states[user_id]['state'] = 'waiting_amount'
+        user_state['data']['recipient'] = recipient_address
+        user_state['state'] = 'waiting_amount'
         
-        keyboard = [[InlineKeyboardButton("⬅️ Отмена", callback_data='escrow_menu')]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = CANCEL_ESCROW_MARKUP
         
         await update.message.reply_text(
-            f"✅ Адрес принят: `{recipient_address}`\n\n"
-            "💰 **Шаг 2/2: Сумма**\n\n"
+            f"✅ Адрес принят: <code>{recipient_address}</code>\n\n"
+            "💰 <b>Шаг 2/2: Сумма</b>\n\n"
             "Введите сумму USDT:\n"
             "Например: 10 или 10.5",
             reply_markup=reply_markup,
-            parse_mode=ParseMode.MARKDOWN
+            parse_mode=ParseMode.HTML
         )
     
     async def handle_amount_input(self, update: Update, context: ContextTypes.DEFAULT_TYPE, amount_text: str):
         """Обработка ввода суммы"""
-        user_id = str(update.effective_user.id)
+        user_id = sys.intern(str(update.effective_user.id))
         
         try:
             amount = float(amount_text)
@@ -711,23 +1224,29 @@ class UnifiedCryptoBot:
                 raise ValueError("Некорректная сумма")
         except ValueError:
             await update.message.reply_text(
-                "⚠️ **Некорректная сумма!**\n\n"
+                "⚠️ <b>Некорректная сумма!</b>\n\n"
                 "Введите положительное число от 0.1 до 10000 USDT\n"
                 "Повторите попытку:",
-                parse_mode=ParseMode.MARKDOWN
+                parse_mode=ParseMode.HTML
             )
             return
         
         # Преобразуем в микро-единицы USDT (6 десятичных знаков)
         usdt_amount = int(amount * 1000000)
         
-        # Сохраняем данные и сразу создаем финальную ссылку
-        user_state = self.user_states[user_id]
+        # Сохраняем данные и сразу создаем финальную ссылку; состояние берем
+        # одним get — запись могла истечь в TTL-кэше после проверки выше
+        user_state = self.user_states.get(user_id)
+        if user_state is None:
+            return
         transaction_id = user_state['transaction_id']
         data = user_state['data']
         data['amount'] = amount
         data['usdt_amount'] = usdt_amount
         
+        # Один захват времени на обработку: deadline и cache_buster считаются от одного момента
+        now = int(time.time())
+
         # Формируем данные для TronLink (только 3 параметра для смарт-контракта)
         transaction_data = {
             "type": "escrow_create",
@@ -735,7 +1254,7 @@ class UnifiedCryptoBot:
             "parameters": {
                 "recipient": data['recipient'],
                 "amount": usdt_amount,
-                "deadline": int(time.time()) + 48*3600  # 48 часов
+                "deadline": now + 48*3600  # 48 часов
             },
             "usdt_contract": self.config.USDT_CONTRACT,
             "usdt_amount": usdt_amount,
@@ -746,17 +1265,18 @@ class UnifiedCryptoBot:
             }
         }
         
-        # Отладочный вывод
-        logger.info(f"Transaction data: {json.dumps(transaction_data, indent=2)}")
+        # Отладочный вывод — сериализуем только если DEBUG реально включен
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Transaction data: %s", _json_dumps(transaction_data))
         
         # Кодируем данные
-        encoded_data = base64.b64encode(json.dumps(transaction_data).encode()).decode()
+        encoded_data = _encode_tronlink_payload(transaction_data)
         # Добавляем timestamp для обхода кеша браузера
-        cache_buster = int(time.time())
+        cache_buster = now
         tronlink_url = f"{self.config.WEB_APP_URL}?data={encoded_data}&v={cache_buster}"
-        
+
         logger.info(f"Generated URL length: {len(tronlink_url)}")
-        logger.info(f"URL: {tronlink_url[:200]}...")
+        logger.debug("URL: %.200s...", tronlink_url)
         
         # Обновляем pending_transactions с полными данными
         if transaction_id in self.pending_transactions:
@@ -767,12 +1287,13 @@ class UnifiedCryptoBot:
                     'amount': amount
                 }
             })
-            self.save_pending_transactions()
+            await asyncio.to_thread(self.save_pending_transactions, transaction_id)
             logger.info(f"Обновлен UUID {transaction_id} в pending_transactions")
         
-        # Очищаем состояние пользователя
-        del self.user_states[user_id]
-        
+        # Очищаем состояние пользователя; pop не падает, если запись уже
+        # выселил TTL-кэш, пока мы ждали записи в пуле потоков
+        self.user_states.pop(user_id, None)
+
         keyboard = [
             [InlineKeyboardButton("💳 Подписать через TronLink", url=tronlink_url)],
             [InlineKeyboardButton("📝 Проверить статус", callback_data=f'check_tx_status_{transaction_id}')],
@@ -780,44 +1301,37 @@ class UnifiedCryptoBot:
         ]
         reply_markup = InlineKeyboardMarkup(keyboard)
         
-        summary_text = (
-            "✅ **Escrow сделка готова!**\n\n"
-            f"🆔 ID: `{transaction_id}`\n"
-            f"📨 Получатель: `{data['recipient']}`\n"
-            f"💰 Сумма: {amount} USDT\n\n"
-            "📋 **Дальше:**\n"
-            "1. Нажмите 'Подписать через TronLink'\n"
-            "2. Откроется браузер с интерфейсом\n"
-            "3. Подтвердите транзакцию в TronLink\n\n"
-            "⚠️ Убедитесь, что TronLink установлен и разблокирован!"
-        )
+        summary_text = _ESCROW_READY_TMPL.format_map({
+            'tx_id': transaction_id,
+            'recipient': data['recipient'],
+            'amount': amount
+        })
         
-        await update.message.reply_text(summary_text, reply_markup=reply_markup, parse_mode=ParseMode.MARKDOWN)
+        await update.message.reply_text(summary_text, reply_markup=reply_markup, parse_mode=ParseMode.HTML)
     
     async def handle_transaction_id_input(self, update: Update, context: ContextTypes.DEFAULT_TYPE, transaction_id: str):
         """Обработка ввода transaction ID (поддерживает UUID и blockchain ID)"""
-        user_id = str(update.effective_user.id)
+        user_id = sys.intern(str(update.effective_user.id))
         input_id = transaction_id.strip()
         
-        # Определяем тип ввода: UUID или blockchain ID
+        # Определяем тип ввода одним разбором: UUID или blockchain ID.
+        # uuid.UUID реализован на C и заодно отсеивает битые UUID до запроса в БД
         tx_id = None
-        is_uuid = False
-        
-        # Проверяем, является ли это UUID (содержит тире и буквы)
-        if '-' in input_id and len(input_id) > 10:
-            # Это похоже на UUID - ищем в базе данных
-            db_transaction = self.db_get_transaction_by_uuid(input_id)
+        try:
+            uuid.UUID(input_id)
+            is_uuid = True
+        except ValueError:
+            is_uuid = False
+
+        if is_uuid:
+            # Это UUID - ищем в базе данных (SQLite в пуле потоков)
+            db_transaction = await asyncio.to_thread(self.db_get_transaction_by_uuid, input_id)
             if db_transaction:
                 tx_id = db_transaction[0]  # blockchain_id из БД
-                is_uuid = True
                 logger.info(f"Найден UUID {input_id} -> blockchain_id {tx_id} в БД")
             else:
                 # UUID не найден - показываем ошибку
-                keyboard = [
-                    [InlineKeyboardButton("🔄 Попробовать снова", callback_data='confirm_escrow')],
-                    [InlineKeyboardButton("🏠 Главная", callback_data='back_to_main')]
-                ]
-                reply_markup = InlineKeyboardMarkup(keyboard)
+                reply_markup = RETRY_HOME_MARKUP
                 
                 await update.message.reply_text(
                     f"❌ UUID сделки не найден!\n\n"
@@ -834,90 +1348,68 @@ class UnifiedCryptoBot:
                     raise ValueError("Отрицательный ID")
                 logger.info(f"Введен blockchain_id: {tx_id}")
             except ValueError:
-                keyboard = [
-                    [InlineKeyboardButton("🔄 Попробовать снова", callback_data='confirm_escrow')],
-                    [InlineKeyboardButton("🏠 Главная", callback_data='back_to_main')]
-                ]
-                reply_markup = InlineKeyboardMarkup(keyboard)
+                reply_markup = RETRY_HOME_MARKUP
                 
                 await update.message.reply_text(
-                    "⚠️ **Некорректный ID!**\n\n"
+                    "⚠️ <b>Некорректный ID!</b>\n\n"
                     "Введите один из вариантов:\n\n"
-                    "• **UUID сделки** (из сообщения бота)\n"
-                    "например: `d9f4d52e-7a4e-4f66-b70c-fae4bd787720`\n\n"
-                    "• **Blockchain ID** (число)\n"
-                    "например: `3`\n\n"
+                    "• <b>UUID сделки</b> (из сообщения бота)\n"
+                    "например: <code>d9f4d52e-7a4e-4f66-b70c-fae4bd787720</code>\n\n"
+                    "• <b>Blockchain ID</b> (число)\n"
+                    "например: <code>3</code>\n\n"
                     "🔄 Попробуйте снова!",
-                    parse_mode=ParseMode.MARKDOWN,
+                    parse_mode=ParseMode.HTML,
                     reply_markup=reply_markup
                 )
                 return
         
         # НОВАЯ ПРОВЕРКА: Проверяем существование сделки в блокчейне
         try:
-            temp_client = TronEscrowUSDTClient(
-                private_key="0000000000000000000000000000000000000000000000000000000000000001",  # Dummy key для чтения
-                contract_address=self.config.ESCROW_CONTRACT,
-                network=self.config.NETWORK
-            )
-            
-            tx_info = temp_client.get_transaction(tx_id)
+            # Первое создание клиента загружает контракты по сети —
+            # тоже в пуле потоков, как и сам RPC ниже
+            temp_client = await asyncio.to_thread(self._get_readonly_client)
+
+            # Синхронный RPC к ноде — в пуле потоков, не блокируя event loop
+            tx_info = await asyncio.to_thread(temp_client.get_transaction, tx_id)
             
             if not tx_info:
-                keyboard = [
-                    [InlineKeyboardButton("🔄 Попробовать снова", callback_data='confirm_escrow')],
-                    [InlineKeyboardButton("🏠 Главная", callback_data='back_to_main')]
-                ]
-                reply_markup = InlineKeyboardMarkup(keyboard)
+                reply_markup = RETRY_HOME_MARKUP
                 
                 await update.message.reply_text(
-                    f"❌ **Сделка не найдена!**\n\n"
+                    f"❌ <b>Сделка не найдена!</b>\n\n"
                     f"🆔 Сделка с ID {tx_id} не существует в блокчейне.\n\n"
                     "🔍 Проверьте правильность ID и попробуйте снова.",
-                    parse_mode=ParseMode.MARKDOWN,
+                    parse_mode=ParseMode.HTML,
                     reply_markup=reply_markup
                 )
                 return
             
             # Проверяем статус сделки
             if tx_info.get('state') != 'AWAITING_DELIVERY':
-                status_display = {
-                    'AWAITING_PAYMENT': '🔄 Ожидание оплаты',
-                    'COMPLETE': '✅ Уже завершена',
-                    'REFUNDED': '🔙 Возвращена',
-                    'DISPUTED': '⚠️ В споре'
-                }.get(tx_info.get('state'), '❓ Неизвестный')
+                status_display = _STATE_DISPLAY.get(tx_info.get('state'), '❓ Неизвестный')
                 
-                keyboard = [
-                    [InlineKeyboardButton("🔄 Попробовать снова", callback_data='confirm_escrow')],
-                    [InlineKeyboardButton("🏠 Главная", callback_data='back_to_main')]
-                ]
-                reply_markup = InlineKeyboardMarkup(keyboard)
+                reply_markup = RETRY_HOME_MARKUP
                 
                 await update.message.reply_text(
-                    f"❌ **Нельзя подтвердить эту сделку!**\n\n"
+                    f"❌ <b>Нельзя подтвердить эту сделку!</b>\n\n"
                     f"🆔 Сделка #{tx_id}\n"
                     f"📊 Текущий статус: {status_display}\n\n"
                     "📝 Подтвердить можно только сделки\n"
                     "в статусе '⏳ Ожидание доставки'",
-                    parse_mode=ParseMode.MARKDOWN,
+                    parse_mode=ParseMode.HTML,
                     reply_markup=reply_markup
                 )
                 return
                 
         except Exception as e:
             logger.error(f"Ошибка проверки сделки: {e}")
-            keyboard = [
-                [InlineKeyboardButton("🔄 Попробовать снова", callback_data='confirm_escrow')],
-                [InlineKeyboardButton("🏠 Главная", callback_data='back_to_main')]
-            ]
-            reply_markup = InlineKeyboardMarkup(keyboard)
+            reply_markup = RETRY_HOME_MARKUP
             
             await update.message.reply_text(
-                f"❌ **Ошибка проверки сделки!**\n\n"
+                f"❌ <b>Ошибка проверки сделки!</b>\n\n"
                 f"Детали: {str(e)}\n\n"
                 "Попробуйте снова или обратитесь к поддержке.",
-                parse_mode=ParseMode.MARKDOWN,
+                parse_mode=ParseMode.HTML,
                 reply_markup=reply_markup
             )
             return
@@ -936,31 +1428,27 @@ class UnifiedCryptoBot:
             }
         }
         
-        # Отладочный вывод
-        logger.info(f"Confirm transaction data: {json.dumps(transaction_data, indent=2)}")
+        # Отладочный вывод — сериализуем только если DEBUG реально включен
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Confirm transaction data: %s", _json_dumps(transaction_data))
         
         # Кодируем данные
-        encoded_data = base64.b64encode(json.dumps(transaction_data).encode()).decode()
+        encoded_data = _encode_tronlink_payload(transaction_data)
         # Добавляем timestamp для обхода кеша браузера
         cache_buster = int(time.time())
         tronlink_url = f"{self.config.WEB_APP_URL}?data={encoded_data}&v={cache_buster}"
-        
+
         logger.info(f"Generated confirm URL length: {len(tronlink_url)}")
-        logger.info(f"Confirm URL: {tronlink_url[:200]}...")
+        logger.debug("Confirm URL: %.200s...", tronlink_url)
         
         # Получаем информацию о сделке из БД или блокчейна
         amount_info = ""
         recipient_info = ""
         
-        # Если UUID был передан, ищем в БД
-        if is_uuid:
-            try:
-                db_transaction = self.db_get_transaction_by_uuid(input_id)
-                if db_transaction:
-                    amount_info = f"💰 Сумма: {db_transaction[2]} USDT\n"
-                    recipient_info = f"👤 Получатель: {db_transaction[3]}\n"
-            except:
-                pass
+        # Если UUID был передан, переиспользуем строку из первого запроса к БД
+        if is_uuid and db_transaction:
+            amount_info = f"💰 Сумма: {db_transaction[2]} USDT\n"
+            recipient_info = f"👤 Получатель: {db_transaction[3]}\n"
         
         # Если не нашли в БД, пытаемся получить из блокчейна
         if not amount_info:
@@ -974,101 +1462,93 @@ class UnifiedCryptoBot:
             except:
                 pass
         
-        # Очищаем состояние пользователя
-        del self.user_states[user_id]
-        
+        # Очищаем состояние пользователя; pop терпим к TTL-выселению записи
+        # за время блокчейн-проверок выше
+        self.user_states.pop(user_id, None)
+
         keyboard = [
             [InlineKeyboardButton("✅ Подтвердить через TronLink", url=tronlink_url)],
             [InlineKeyboardButton("⬅️ Назад", callback_data='escrow_menu')]
         ]
         reply_markup = InlineKeyboardMarkup(keyboard)
         
-        summary_text = (
-            "✅ **Ссылка подтверждения готова!**\n\n"
-            f"🔢 Transaction ID: `{tx_id}`\n"
-            f"{amount_info}"
-            f"{recipient_info}\n"
-            "📋 **Дальше:**\n"
-            "1. Нажмите 'Подтвердить через TronLink'\n"
-            "2. Откроется браузер с интерфейсом\n"
-            "3. Подтвердите транзакцию в TronLink\n\n"
-            "⚠️ **ВНИМАНИЕ:** Подтверждайте только \n"
-            "после получения товара/услуги!"
-        )
+        summary_text = _CONFIRM_READY_TMPL.format_map({
+            'tx_id': tx_id,
+            'amount_info': amount_info,
+            'recipient_info': recipient_info
+        })
         
-        await update.message.reply_text(summary_text, reply_markup=reply_markup, parse_mode=ParseMode.MARKDOWN)
+        await update.message.reply_text(summary_text, reply_markup=reply_markup, parse_mode=ParseMode.HTML)
 
     async def my_transactions_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Просмотр сделок пользователя"""
         query = update.callback_query
         await query.answer()
         
-        user_id = str(update.effective_user.id)
+        user_id = sys.intern(str(update.effective_user.id))
         
         try:
-            # Получаем подтвержденные сделки из БД
-            with self.get_db_conn() as conn:
-                cur = conn.cursor()
-                cur.execute("SELECT * FROM transactions WHERE user_id = ? ORDER BY created_at DESC LIMIT 10", (user_id,))
-                confirmed_transactions = cur.fetchall()
+            # Получаем подтвержденные сделки из БД — в пуле потоков, не блокируя event loop
+            confirmed_transactions = await asyncio.to_thread(self._fetch_user_txs_sync, user_id)
             
-            # Получаем ожидающие сделки
-            pending_transactions = []
-            for uuid, tx_data in self.pending_transactions.items():
-                if tx_data.get('user_id') == user_id:
-                    pending_transactions.append({
-                        'uuid': uuid,
-                        'status': tx_data.get('status', 'unknown'),
-                        'amount': tx_data.get('data', {}).get('amount', 0),
-                        'recipient': tx_data.get('data', {}).get('recipient', 'N/A'),
-                        'created_at': tx_data.get('created_at', 0)
-                    })
+            # Получаем ожидающие сделки из индекса по пользователю
+            pending_transactions = [
+                {
+                    'uuid': tx_uuid,
+                    'status': tx_data.get('status', 'unknown'),
+                    'amount': tx_data.get('data', {}).get('amount', 0),
+                    'recipient': tx_data.get('data', {}).get('recipient', 'N/A'),
+                    'created_at': tx_data.get('created_at', 0)
+                }
+                for tx_uuid, tx_data in self._pending_by_user.get(user_id, {}).items()
+            ]
             
-            # Сортируем по времени создания
-            pending_transactions.sort(key=lambda x: x['created_at'], reverse=True)
+            # Нужны только 3 самые свежие — nlargest дешевле полной сортировки
+            pending_transactions = heapq.nlargest(3, pending_transactions, key=lambda x: x['created_at'])
             
             if not confirmed_transactions and not pending_transactions:
                 text = "📋 У вас пока нет сделок."
             else:
-                text = "📋 Ваши сделки:\n\n"
-                
+                # Собираем текст списком фрагментов: += на str копирует строку целиком
+                parts = ["📋 Ваши сделки:\n\n"]
+
                 # Показываем ожидающие сделки
                 if pending_transactions:
-                    text += "⏳ Ожидают подписания:\n"
-                    for pending in pending_transactions[:3]:  # Показываем последние 3
-                        created_date = datetime.fromtimestamp(pending['created_at']).strftime("%Y-%m-%d %H:%M")
+                    parts.append("⏳ Ожидают подписания:\n")
+                    for pending in pending_transactions:  # Последние 3 (отобраны выше)
+                        created_date = time.strftime("%Y-%m-%d %H:%M", time.localtime(pending['created_at']))
                         status_emoji = "🔄" if pending['status'] == 'pending_signature' else "🔧"
-                        text += (
+                        parts.append(
                             f"{status_emoji} UUID: {pending['uuid']}\n"
                             f"💰 Сумма: {pending['amount']} USDT\n"
                             f"👤 Получатель: {pending['recipient']}\n"
                             f"📅 {created_date}\n\n"
                         )
-                
+
                 # Показываем подтвержденные сделки
                 if confirmed_transactions:
-                    text += "✅ Подтвержденные в блокчейне:\n"
-                    for tx in confirmed_transactions[:5]:  # Показываем последние 5
-                        tx_id, _, amount, recipient, status, role, created_at, uuid_field = tx
-                        created_date = datetime.fromtimestamp(created_at).strftime("%Y-%m-%d %H:%M")
+                    parts.append("✅ Подтвержденные в блокчейне:\n")
+                    for tx in confirmed_transactions:  # Последние 5 (LIMIT на стороне SQL)
+                        tx_id, amount, recipient, status, created_at, uuid_field = tx
+                        created_date = time.strftime("%Y-%m-%d %H:%M", time.localtime(created_at))
                         if uuid_field:
                             display_id = f"UUID: {uuid_field}"
                         else:
                             display_id = f"ID: {tx_id}"
-                        text += (
+                        parts.append(
                             f"✅ {display_id}\n"
                             f"💰 Сумма: {amount} USDT\n"
                             f"👤 Получатель: {recipient}\n"
                             f"📄 Статус: {status}\n"
                             f"📅 {created_date}\n\n"
                         )
+                text = "".join(parts)
                     
         except Exception as e:
             logger.error(f"Ошибка в my_transactions_handler: {e}")
             text = f"❌ Ошибка получения данных: {e}"
             
-        keyboard = [[InlineKeyboardButton("⬅️ Назад", callback_data='escrow_menu')]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = BACK_ESCROW_MARKUP
         
         await query.edit_message_text(text, reply_markup=reply_markup)
 
@@ -1077,7 +1557,7 @@ class UnifiedCryptoBot:
         query = update.callback_query
         await query.answer()
         
-        user_id = str(update.effective_user.id)
+        user_id = sys.intern(str(update.effective_user.id))
         
         # Сохраняем состояние пользователя
         self.user_states[user_id] = {
@@ -1085,23 +1565,22 @@ class UnifiedCryptoBot:
             'data': {}
         }
         
-        keyboard = [[InlineKeyboardButton("⬅️ Отмена", callback_data='escrow_menu')]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = CANCEL_ESCROW_MARKUP
         
         text = (
-            "✅ **Подтверждение эскроу сделки**\n\n"
+            "✅ <b>Подтверждение эскроу сделки</b>\n\n"
             "📨 Введите ID сделки для подтверждения:\n\n"
-            "🆔 **UUID сделки** (из сообщения бота):\n"
-            "`f703898c-663c-4972-b03f-50c885d60e9e`\n\n"
-            "🔢 **Или Blockchain ID** (число):\n"
-            "`5`\n\n"
-            "ℹ️ **Когда подтверждать:**\n"
+            "🆔 <b>UUID сделки</b> (из сообщения бота):\n"
+            "<code>f703898c-663c-4972-b03f-50c885d60e9e</code>\n\n"
+            "🔢 <b>Или Blockchain ID</b> (число):\n"
+            "<code>5</code>\n\n"
+            "ℹ️ <b>Когда подтверждать:</b>\n"
             "• Когда вы получили товар/услугу\n"
             "• Когда уверены в качестве\n"
             "• После этого средства перейдут продавцу"
         )
         
-        await query.edit_message_text(text, reply_markup=reply_markup, parse_mode=ParseMode.MARKDOWN)
+        await query.edit_message_text(text, reply_markup=reply_markup, parse_mode=ParseMode.HTML)
 
     # ================== NAVIGATION HANDLERS ==================
     async def back_to_main_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -1114,61 +1593,35 @@ class UnifiedCryptoBot:
         await query.answer()
         
         user = update.effective_user
-        user_id = str(user.id)
+        user_id = sys.intern(str(user.id))
         
-        # Получаем статистику пользователя
+        # Получаем статистику пользователя — SQLite в пуле потоков, не блокируя event loop
         try:
-            with self.get_db_conn() as conn:
-                cur = conn.cursor()
-                cur.execute("SELECT COUNT(*) FROM transactions WHERE user_id = ?", (user_id,))
-                tx_count = cur.fetchone()[0]
-                
+            tx_count = await asyncio.to_thread(self._count_user_txs_sync, user_id)
         except:
             tx_count = 0
             
         text = (
-            f"👤 **Ваш профиль**\n\n"
-            f"🆔 ID: `{user.id}`\n"
-            f"👤 Имя: {user.first_name or 'неизвестно'}\n"
+            f"👤 <b>Ваш профиль</b>\n\n"
+            f"🆔 ID: <code>{user.id}</code>\n"
+            f"👤 Имя: {html.escape(user.first_name or 'неизвестно')}\n"
             f"📧 Username: @{user.username or 'не указан'}\n"
             f"📊 Сделок: {tx_count}\n"
             f"🌐 Сеть: {self.config.NETWORK}\n"
         )
         
-        keyboard = [[InlineKeyboardButton("⬅️ Назад", callback_data='back_to_main')]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = BACK_MAIN_MARKUP
         
-        await query.edit_message_text(text, reply_markup=reply_markup, parse_mode=ParseMode.MARKDOWN)
+        await query.edit_message_text(text, reply_markup=reply_markup, parse_mode=ParseMode.HTML)
 
     async def help_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Справка"""
         query = update.callback_query
         await query.answer()
         
-        text = (
-            "ℹ️ **Справка по боту**\n\n"
-            "**💰 Эскроу сделки:**\n"
-            "• Безопасные P2P сделки с USDT\n"
-            "• Используется смарт-контракт на TRON\n"
-            "• Интеграция с TronLink кошельком\n\n"
-            "**📊 Криптоаналитика:**\n"
-            "• Bitcoin доминация (CoinGecko)\n"
-            "• Данные по Ethereum (Binance)\n"
-            "• Fear & Greed Index\n"
-            "• Фондовые индексы (Yahoo Finance)\n"
-            "• Funding rates (Binance, Bybit)\n"
-            "• Long/Short соотношения\n\n"
-            "**🔒 Безопасность:**\n"
-            "• Боту не передаются приватные ключи\n"
-            "• Подписание через TronLink\n"
-            "• Данные хранятся локально\n\n"
-            "❓ Вопросы? Свяжитесь с администратором."
-        )
-        
-        keyboard = [[InlineKeyboardButton("⬅️ Назад", callback_data='back_to_main')]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        await query.edit_message_text(text, reply_markup=reply_markup, parse_mode=ParseMode.MARKDOWN)
+        reply_markup = BACK_MAIN_MARKUP
+
+        await query.edit_message_text(HELP_TEXT, reply_markup=reply_markup, parse_mode=ParseMode.HTML)
 
     async def check_tx_status_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Проверка статуса транзакции с автосинхронизацией"""
@@ -1177,12 +1630,12 @@ class UnifiedCryptoBot:
         
         # Извлекаем UUID из callback_data
         tx_uuid = query.data.replace('check_tx_status_', '')
-        user_id = str(update.effective_user.id)
+        user_id = sys.intern(str(update.effective_user.id))
         
         logger.info(f"Проверка статуса UUID: {tx_uuid}")
         
-        # Проверяем, есть ли UUID уже в БД
-        db_transaction = self.db_get_transaction_by_uuid(tx_uuid)
+        # Проверяем, есть ли UUID уже в БД (SQLite в пуле потоков)
+        db_transaction = await asyncio.to_thread(self.db_get_transaction_by_uuid, tx_uuid)
         
         if db_transaction:
             # UUID уже связан с blockchain ID
@@ -1208,56 +1661,24 @@ class UnifiedCryptoBot:
             recipient = pending_data.get('data', {}).get('recipient', '')
             
             try:
-                # Создаем клиент для проверки блокчейна
-                temp_client = TronEscrowUSDTClient(
-                    private_key="0000000000000000000000000000000000000000000000000000000000000001",
-                    contract_address=self.config.ESCROW_CONTRACT,
-                    network=self.config.NETWORK
-                )
-                
-                # Получаем общее количество транзакций
-                total_transactions = temp_client.get_transaction_count()
-                
-                # Ищем среди последних 10 транзакций
-                found_blockchain_id = None
-                
-                for blockchain_id in range(total_transactions - 1, max(-1, total_transactions - 10), -1):
-                    try:
-                        tx_info = temp_client.get_transaction(blockchain_id)
-                        if not tx_info:
-                            continue
-                            
-                        blockchain_recipient = tx_info.get('recipient', '')
-                        tx_state = tx_info.get('state', '')
-                        
-                        # Проверяем совпадение по получателю и статусу AWAITING_DELIVERY
-                        if (blockchain_recipient.lower() == recipient.lower() and 
-                            tx_state == 'AWAITING_DELIVERY'):
-                            found_blockchain_id = blockchain_id
-                            break
-                            
-                    except Exception as e:
-                        logger.warning(f"Ошибка при проверке транзакции {blockchain_id}: {e}")
-                        continue
-                
+                found_blockchain_id = await self._probe_pending_in_chain(tx_uuid, recipient)
+
                 if found_blockchain_id is not None:
-                    # Найдена в блокчейне - сохраняем в БД
+                    # Найдена в блокчейне - переносим из pending в подтвержденные
+                    # одной транзакцией БД (вставка + удаление pending-строки)
                     created_at = pending_data.get('created_at', int(time.time()))
-                    self.db_add_transaction(
-                        user_id=user_id,
-                        tx_id=found_blockchain_id,
-                        amount_usdt=amount,
-                        recipient=recipient,
-                        role='creator',
-                        status='AWAITING_DELIVERY',
-                        created_at=created_at,
-                        uuid=tx_uuid
+                    await asyncio.to_thread(
+                        self.db_promote_pending,
+                        (found_blockchain_id, user_id, amount, recipient,
+                         'AWAITING_DELIVERY', 'creator', created_at, tx_uuid),
+                        tx_uuid
                     )
-                    
-                    # Удаляем из pending
-                    del self.pending_transactions[tx_uuid]
-                    self.save_pending_transactions()
-                    
+
+                    # Чистим кэши в памяти; pop — два конкурентных нажатия
+                    # «Проверить снова» могут синхронизировать один uuid
+                    self.pending_transactions.pop(tx_uuid, None)
+                    self._pending_by_user[pending_data.get('user_id')].pop(tx_uuid, None)
+
                     logger.info(f"✅ Автосинхронизация: UUID {tx_uuid} -> Blockchain ID {found_blockchain_id}")
                     
                     text = (
@@ -1299,105 +1720,126 @@ class UnifiedCryptoBot:
                 "ни в ожидающих транзакциях."
             )
         
-        keyboard = [
-            [InlineKeyboardButton("🔄 Проверить снова", callback_data=f'check_tx_status_{tx_uuid}')],
-            [InlineKeyboardButton("⬅️ Назад к эскроу", callback_data='escrow_menu')]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
+        # Кнопка «Проверить снова» зависит от uuid, статичная строка —
+        # общий модульный объект (кнопки в PTB неизменяемы и переиспользуемы)
+        reply_markup = InlineKeyboardMarkup([
+            [InlineKeyboardButton("🔄 Проверить снова", callback_data=query.data)],
+            BACK_TO_ESCROW_ROW
+        ])
+
         await query.edit_message_text(text, reply_markup=reply_markup)
 
     # ================== CALLBACK QUERY ROUTER ==================
     async def callback_query_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Точка входа callback'ов.
+
+        Конкурентность обеспечивает сам PTB: block=False запускает обработчик
+        отдельной задачей, а concurrent_updates(256) ограничивает их число.
+        Медленный обработчик одного пользователя не задерживает остальных.
+        """
+        try:
+            await self._route_callback(update, context)
+        except Exception as e:
+            logger.error(f"Ошибка обработки callback: {e}")
+
+    async def _route_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Главный роутер callback запросов"""
         query = update.callback_query
         data = query.data
         
         logger.info(f"Обработка callback: {data}")
-        
-        # Навигация
-        if data == 'back_to_main':
-            await self.back_to_main_handler(update, context)
-        elif data == 'my_profile':
-            await self.my_profile_handler(update, context)
-        elif data == 'help':
-            await self.help_handler(update, context)
-            
-        # Главные меню (обработка перенесена в эскроу секцию)
-        elif data == 'crypto_menu':
-            await self.crypto_menu(update, context)
-            
-        # Эскроу функции
-        elif data == 'create_escrow':
-            await self.create_escrow_handler(update, context)
-        elif data == 'confirm_escrow':
-            await self.confirm_escrow_handler(update, context)
-        elif data == 'my_transactions':
-            await self.my_transactions_handler(update, context)
-        elif data == 'escrow_menu':
-            # Очищаем состояние пользователя при возврате к меню
-            user_id = str(update.effective_user.id)
-            if user_id in self.user_states:
-                del self.user_states[user_id]
-            await self.escrow_menu(update, context)
-            
-        # Криптоаналитика - основные функции
-        elif data == 'btc_dominance':
-            await self.btc_dominance_handler(update, context)
-        elif data == 'fear_greed':
-            await self.fear_greed_handler(update, context)
-        elif data == 'stock_indexes':
-            await self.stock_indexes_handler(update, context)
-            
-        # Графики монет
-        elif data == 'coins_chart_menu':
-            await self.coins_chart_menu_handler(update, context)
-        elif data.startswith('coin_'):
-            await self.coin_timeframes_handler(update, context) 
-        elif data.startswith('chart_'):
-            await self.chart_handler(update, context)
-            
-        # Funding rates для всех монет
-        elif data == 'funding_rates_menu':
-            await self.funding_rates_menu_handler(update, context)
-        elif data.startswith('funding_') and data != 'funding_rates_menu':
-            await self.funding_coin_handler(update, context)
-            
-        # Long/Short ratio для всех монет
-        elif data == 'longshort_menu':
-            await self.longshort_menu_handler(update, context)
-        elif data.startswith('longshort_'):
-            await self.longshort_coin_handler(update, context)
-        
+
+        # Точные совпадения — O(1) по словарю
+        handler = self._cb_handlers.get(data)
+        if handler is not None:
+            await handler(update, context)
+
+        # Callback'и по конкретной монете: один regex + словарь вместо цепочки startswith
+        elif (match := _COIN_CALLBACK_RE.match(data)) is not None:
+            await self._coin_handlers[match.group(1)](update, context)
+
         # Проверка статуса транзакции с автосинхронизацией
         elif data.startswith('check_tx_status_'):
             await self.check_tx_status_handler(update, context)
-        
+
         else:
             await query.answer("❌ Неизвестная команда")
 
+    async def _escrow_menu_with_reset(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Возврат к эскроу меню со сбросом состояния пользователя"""
+        user_id = sys.intern(str(update.effective_user.id))
+        if user_id in self.user_states:
+            del self.user_states[user_id]
+        await self.escrow_menu(update, context)
+
 def main():
     """Запуск бота"""
-    print("🚀 Запуск Unified Crypto & Escrow Bot...")
-    
+    logger.info("🚀 Запуск Unified Crypto & Escrow Bot...")
+
+    # uvloop заметно снижает накладные расходы event loop на Linux;
+    # на других платформах или без пакета работаем на стандартном цикле
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+
     try:
         bot = UnifiedCryptoBot()
-        print(f"📋 Токен бота загружен")
-        print(f"🌐 Сеть TRON: {bot.config.NETWORK}")
-        print(f"📋 Контракт: {bot.config.ESCROW_CONTRACT}")
-        print(f"⚖️ Арбитр: {bot.config.ARBITRATOR_ADDRESS}")
-        print("✅ Бот готов к работе с объединенным функционалом!")
-        
-        # Создаем приложение
-        application = Application.builder().token(bot.config.BOT_TOKEN).build()
-        
-        # Добавляем обработчики
-        application.add_handler(CommandHandler("start", bot.start_command))
-        application.add_handler(CallbackQueryHandler(bot.callback_query_handler))
-        application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, bot.handle_text_input))
-        
-        # Запускаем бота
-        application.run_polling(allowed_updates=Update.ALL_TYPES)
+        # Один структурированный logger.info вместо пяти print: единый формат
+        # логов и одна запись в stdout при старте
+        logger.info(
+            "✅ Бот готов | network=%s contract=%s arbitrator=%s",
+            bot.config.NETWORK, bot.config.ESCROW_CONTRACT, bot.config.ARBITRATOR_ADDRESS
+        )
+        
+        # Создаем приложение; concurrent_updates позволяет обрабатывать апдейты
+        # разных пользователей параллельно (с ограничением, чтобы не исчерпать
+        # пул соединений к TRON RPC). Увеличенный пул HTTPXRequest — чтобы
+        # параллельные edit/answer не стояли в очереди на одно соединение
+        # run_polling/run_webhook сами перехватывают SIGINT/SIGTERM и гасят
+        # приложение; post_shutdown дозакрывает наши ресурсы (соединение с БД)
+        async def _post_shutdown(app):
+            bot.close()
+
+        builder = (
+            Application.builder()
+            .token(bot.config.BOT_TOKEN)
+            .request(HTTPXRequest(connection_pool_size=256, read_timeout=30, write_timeout=30, connect_timeout=5))
+            .get_updates_request(HTTPXRequest(connection_pool_size=8))
+            .concurrent_updates(256)
+            .post_shutdown(_post_shutdown)
+        )
+        # Rate limiter размазывает отправки по лимитам Telegram (30 msg/s
+        # общий, 20 msg/min на группу) вместо всплесков с 429 и ретраями
+        if AIORateLimiter is not None:
+            builder = builder.rate_limiter(
+                AIORateLimiter(overall_max_rate=30, overall_time_period=1,
+                               group_max_rate=20, group_time_period=60)
+            )
+        application = builder.build()
+        
+        # Добавляем обработчики; block=False — медленный TRON RPC одного
+        # пользователя не задерживает апдейты остальных
+        application.add_handler(CommandHandler("start", bot.start_command, block=False))
+        application.add_handler(CallbackQueryHandler(bot.callback_query_handler, block=False))
+        application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, bot.handle_text_input, block=False))
+        
+        # Запускаем бота: webhook (если задан WEBHOOK_URL) убирает задержку
+        # и трафик getUpdates — Telegram сам пушит апдейты. allowed_updates
+        # ограничен реально обрабатываемыми типами, чтобы не десериализовать лишнее
+        allowed_updates = ["message", "callback_query"]
+        webhook_url = os.getenv("WEBHOOK_URL")
+        if webhook_url:
+            application.run_webhook(
+                listen="0.0.0.0",
+                port=int(os.getenv("WEBHOOK_PORT", "8443")),
+                url_path=bot.config.BOT_TOKEN,
+                webhook_url=f"{webhook_url.rstrip('/')}/{bot.config.BOT_TOKEN}",
+                allowed_updates=allowed_updates
+            )
+        else:
+            application.run_polling(allowed_updates=allowed_updates)
         
     except Exception as e:
         logger.error(f"❌ Ошибка запуска бота: {e}")
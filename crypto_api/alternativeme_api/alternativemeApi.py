@@ -1,6 +1,16 @@
 import requests
 from datetime import datetime
 
+# Шаблон ответа неизменен — держим его на уровне модуля и подставляем
+# значения %-форматированием вместо пересборки f-строки на каждый вызов
+_FG_TMPL = (
+    "📊 Fear & Greed Index\n"
+    "------------------------\n"
+    "🧠 Значение:         %s\n"
+    "📈 Классификация:    %s\n"
+    "⏰ Время обновления:  %s\n"
+)
+
 class FearGreedAPI:
     @staticmethod
     def get_index():
@@ -13,13 +23,4 @@ class FearGreedAPI:
         timestamp = datetime.fromtimestamp(int(data['timestamp']))
         readable_time = timestamp.strftime('%Y-%m-%d %H:%M:%S')
 
-        # Инициализируем result как пустую строку
-        result = (
-            "📊 Fear & Greed Index\n"
-            "------------------------\n"
-            f"🧠 Значение:         {value}\n"
-            f"📈 Классификация:    {classification}\n"
-            f"⏰ Время обновления:  {readable_time}\n"
-        )
-
-        return result
\ No newline at end of file
+        return _FG_TMPL % (value, classification, readable_time)
@@ -1,5 +1,6 @@
 from datetime import datetime, timezone, timedelta
 import os
+import time
 from dotenv import load_dotenv
 from binance.client import Client
 
@@ -12,7 +13,8 @@ client = Client(api_key, api_secret)
 
 def Candles_info_binanceApi(interval, symbol, limit):
     candles = client.get_klines(symbol=symbol, interval=interval, limit=limit)
-    result = ""
+    # Копим куски в списке и склеиваем один раз: += по строке в цикле — O(N²)
+    parts = []
     for c in candles:
         open_price = float(c[1])
         high_price = float(c[2])
@@ -20,10 +22,11 @@ def Candles_info_binanceApi(interval, symbol, limit):
         close_price = float(c[4])
         avg_price = (high_price + low_price) / 2
 
-        open_time = datetime.fromtimestamp(c[0] / 1000)
+        # time.strftime без промежуточного datetime-объекта — дешевле на свечу
+        open_time = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(c[0] / 1000))
 
-        result += (
-            f"Open time: {open_time.strftime('%Y-%m-%d %H:%M:%S')}\n"
+        parts.append(
+            f"Open time: {open_time}\n"
             f"Open: {open_price}\n"
             f"High: {high_price}\n"
             f"Low: {low_price}\n"
@@ -31,7 +34,7 @@ def Candles_info_binanceApi(interval, symbol, limit):
             f"Average Price: {avg_price:.4f}\n"
             "------------------------\n"
         )
-    return result
+    return "".join(parts)
 
 def get_binance_funding_rate(symbol, limit=1, hours=8):
     """
@@ -39,7 +42,6 @@ def get_binance_funding_rate(symbol, limit=1, hours=8):
     limit: количество последних записей
     hours: если указано, возвращает данные только за последние N часов
     """
-    client = Client()
     try:
         funding_rates = client.futures_funding_rate(symbol=symbol, limit=limit)
         result_list = []
@@ -1,8 +1,11 @@
 from pybit.unified_trading import HTTP
 from datetime import datetime, timezone, timedelta
 
+# Одна сессия на модуль: каждый HTTP() открывает новое TCP/TLS соединение,
+# общая переиспользует keep-alive сокеты requests.Session
+session = HTTP()
+
 def get_long_short_ratio(symbol="ETHUSDT", period="5min", category="linear"):
-    session = HTTP()
     resp = session.get_long_short_ratio(
         category=category,
         symbol=symbol,
@@ -26,8 +29,6 @@ def get_funding_rate(symbol, limit=1):
     Получает funding rate от Bybit
     """
     try:
-        session = HTTP()
-
         # Просто получаем последние funding rates без startTime
         response = session.get_funding_rate_history(
             category="linear",
@@ -1,25 +1,29 @@
 from pycoingecko import CoinGeckoAPI
+from cachetools import cached, TTLCache
 
 cg = CoinGeckoAPI()
-        
+
+# Статичные шаблоны ответов на уровне модуля — не пересобираем строки в функциях
+_MARKET_CAP_TMPL = (
+    "Рыночная капитализация %s: %s USD\n"
+    "Изменение: %.2f%%"
+)
+_BTC_DOMINANCE_TMPL = "Доминация Bitcoin: %.2f%%"
+
+# CoinGecko на бесплатном тарифе отдает 10-30 запросов в минуту; минутный кэш
+# превращает всплеск одинаковых запросов в один поход к API
+@cached(TTLCache(maxsize=256, ttl=60))
 def CoinGeko_market_cap(coin_id, interval):
-    result = ""
     data = cg.get_coin_by_id(id=coin_id)
     market_cap = data['market_data']['market_cap']['usd']
     change_procents_per_time = data['market_data'][interval]
 
-    result += (
-        f"Рыночная капитализация {coin_id.capitalize()}: {market_cap:,} USD\n"
-        f"Изменение: {change_procents_per_time['usd']:.2f}%"
+    return _MARKET_CAP_TMPL % (
+        coin_id.capitalize(), format(market_cap, ','), change_procents_per_time['usd']
     )
-    return result
-        
+
 def CoinGeko_btc_dominance():
-    result = ""
     global_data = cg.get_global()
     btc_dominance = global_data['market_cap_percentage']['btc']
 
-    result += (
-        f"Доминация Bitcoin: {btc_dominance:.2f}%"
-    )
-    return result
\ No newline at end of file
+    return _BTC_DOMINANCE_TMPL % btc_dominance
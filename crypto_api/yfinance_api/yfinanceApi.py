@@ -7,14 +7,35 @@ indexes = {
     "Nikkei 225": "^N225",
     "Russell 2000": "^RUT"
 }
-    
+
+# Шаблон блока по индексу не меняется — выносим на уровень модуля
+_INDEX_TMPL = (
+    "%s:\n"
+    "  Min month: %.2f\n"
+    "  Max month: %.2f\n"
+    "  Day close price: %.2f\n"
+    "  difference (min → max): %+.2f%%\n"
+    "  difference (min → close): %+.2f%%\n\n"
+)
+
 def Yfinance_get_index_stats(period):
-    result = ""
+    # Один батч-запрос на все индексы вместо пяти последовательных round-trip
+    data = yf.download(
+        list(indexes.values()),
+        period=period,
+        group_by='ticker',
+        threads=True,
+        progress=False
+    )
+
+    parts = []
     for name, ticker in indexes.items():
-        data = yf.Ticker(ticker)
-        hist = data.history(period=period)
+        try:
+            hist = data[ticker].dropna(how='all')
+        except KeyError:
+            hist = None
 
-        if hist.empty:
+        if hist is None or hist.empty:
             print(f"{name}: Нет данных за последний месяц")
             continue
 
@@ -26,12 +47,7 @@ def Yfinance_get_index_stats(period):
 
         current_change_pct = ((close_price - low_price) / low_price) * 100
 
-        result += (
-            f"{name}:\n"
-            f"  Min month: {low_price:.2f}\n"
-            f"  Max month: {high_price:.2f}\n"
-            f"  Day close price: {close_price:.2f}\n"
-            f"  difference (min → max): {range_change_pct:+.2f}%\n"
-            f"  difference (min → close): {current_change_pct:+.2f}%\n\n"
-        )
-    return result
\ No newline at end of file
+        parts.append(_INDEX_TMPL % (
+            name, low_price, high_price, close_price, range_change_pct, current_change_pct
+        ))
+    return "".join(parts)
@@ -7,6 +7,8 @@ import json
 import os
 from tronapi import Tron
 from tronapi.providers.http import HttpProvider
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 import sys
 
 # Добавляем путь к корневой папке проекта
@@ -43,6 +45,12 @@ def check_all_transactions():
     # Инициализация Tron API
     tron = Tron()
     tron.set_http_provider(provider_url)
+
+    # Декодирование base58check — двойной SHA256 на каждый вызов;
+    # адреса в эскроу повторяются, кэшируем результат
+    @lru_cache(maxsize=4096)
+    def hex_to_tron_addr(hex40):
+        return "T" + tron.toBase58Check("41" + hex40)
     
     try:
         # Получаем количество транзакций
@@ -68,19 +76,27 @@ def check_all_transactions():
             print("ℹ️  Транзакций нет")
             return
             
-        # Получаем информацию о каждой транзакции
-        for tx_id in range(count):
+        # Запрашиваем все транзакции параллельно: каждый вызов — отдельный
+        # HTTPS round-trip, последовательный цикл ждал бы их сумму
+        def fetch_tx(tx_id):
+            try:
+                return tron.trx.trigger_smart_contract(
+                    contract_address,
+                    "getTransaction(uint256)",
+                    f"{tx_id:064x}",  # Преобразуем в hex с нулями слева
+                    "",
+                    ""
+                )
+            except Exception as e:
+                return {'error': str(e)}
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(fetch_tx, range(count)))
+
+        # Выводим в исходном порядке
+        for tx_id, result in enumerate(results):
             print(f"\n🔍 Транзакция {tx_id}:")
-            
-            # Вызываем getTransaction
-            result = tron.trx.trigger_smart_contract(
-                contract_address,
-                "getTransaction(uint256)",
-                f"{tx_id:064x}",  # Преобразуем в hex с нулями слева
-                "",
-                ""
-            )
-            
+
             if not result.get('result', {}).get('result'):
                 print(f"  ❌ Ошибка получения транзакции {tx_id}")
                 continue
@@ -92,15 +108,17 @@ def check_all_transactions():
                 print(f"  ❌ Некорректный результат для транзакции {tx_id}")
                 continue
                 
-            # Парсим результат (8 параметров)
-            sender = "T" + tron.toBase58Check("41" + constant_result[24:64])  # address sender
-            recipient = "T" + tron.toBase58Check("41" + constant_result[88:128])  # address recipient
-            amount = int(constant_result[128:192], 16)  # uint256 amount
-            state = int(constant_result[192:256], 16)  # State state
-            created_at = int(constant_result[256:320], 16)  # uint256 createdAt
-            deadline = int(constant_result[320:384], 16)  # uint256 deadline
-            sender_approved = bool(int(constant_result[384:448], 16))  # bool senderApproved
-            recipient_approved = bool(int(constant_result[448:512], 16))  # bool recipientApproved
+            # Парсим результат (8 параметров): один bytes.fromhex + int.from_bytes
+            # по 32-байтовым словам вместо восьми int(slice, 16)
+            raw = bytes.fromhex(constant_result[:512])
+            sender = hex_to_tron_addr(constant_result[24:64])  # address sender
+            recipient = hex_to_tron_addr(constant_result[88:128])  # address recipient
+            amount = int.from_bytes(raw[64:96], 'big')  # uint256 amount
+            state = int.from_bytes(raw[96:128], 'big')  # State state
+            created_at = int.from_bytes(raw[128:160], 'big')  # uint256 createdAt
+            deadline = int.from_bytes(raw[160:192], 'big')  # uint256 deadline
+            sender_approved = bool(int.from_bytes(raw[192:224], 'big'))  # bool senderApproved
+            recipient_approved = bool(int.from_bytes(raw[224:256], 'big'))  # bool recipientApproved
             
             # Названия состояний
             state_names = {
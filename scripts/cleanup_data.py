@@ -6,8 +6,10 @@
 
 import os
 import json
+import shutil
 import sqlite3
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 import sys
 
 # Добавляем путь к корневой директории
@@ -15,6 +17,24 @@ sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 from scripts.tron_escrow_usdt_client import TronEscrowUSDTClient
 
+# orjson (C-реализация) заметно быстрее stdlib json на больших users_data.json;
+# при его отсутствии работаем на stdlib
+try:
+    import orjson
+
+    def _json_loads(data):
+        return orjson.loads(data)
+
+    def _json_dumps(obj):
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+except ImportError:
+    def _json_loads(data):
+        return json.loads(data)
+
+    def _json_dumps(obj):
+        return json.dumps(obj, ensure_ascii=False, indent=2)
+
+
 class DataCleaner:
     def __init__(self):
         self.root_dir = os.path.dirname(os.path.dirname(__file__))
@@ -30,17 +50,17 @@ class DataCleaner:
         """Загрузка JSON файла"""
         try:
             if os.path.exists(filepath):
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                with open(filepath, 'rb') as f:
+                    return _json_loads(f.read())
         except Exception as e:
             print(f"⚠️  Ошибка загрузки {filepath}: {e}")
         return {}
-    
+
     def save_json_file(self, filepath, data):
         """Сохранение JSON файла"""
         try:
             with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+                f.write(_json_dumps(data))
             print(f"✅ Сохранен {filepath}")
         except Exception as e:
             print(f"❌ Ошибка сохранения {filepath}: {e}")
@@ -53,11 +73,19 @@ class DataCleaner:
                 print("❌ Не удалось получить количество транзакций из блокчейна")
                 return set()
             
-            valid_ids = set()
-            for tx_id in range(tx_count):
-                tx_info = self.client.get_transaction(tx_id)
-                if tx_info:
-                    valid_ids.add(tx_id)
+            # Каждый get_transaction — отдельный RPC; запрашиваем параллельно,
+            # чтобы время было ~max(RPC), а не суммой всех round-trip
+            def fetch_tx(tx_id):
+                try:
+                    return tx_id, self.client.get_transaction(tx_id)
+                except Exception as e:
+                    print(f"⚠️  Ошибка проверки транзакции {tx_id}: {e}")
+                    return tx_id, None
+
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                results = pool.map(fetch_tx, range(tx_count))
+
+            valid_ids = {tx_id for tx_id, tx_info in results if tx_info}
             
             print(f"🔗 Найдено {len(valid_ids)} реальных транзакций в блокчейне: {sorted(valid_ids)}")
             return valid_ids
@@ -76,37 +104,35 @@ class DataCleaner:
             return
         
         cleaned = False
-        
+        # Копим сообщения и печатаем одним write: на больших файлах
+        # построчный print с flush заметно дороже самой фильтрации
+        msgs = []
+
         for user_id, user_data in data.items():
             if 'transactions' in user_data:
-                original_count = len(user_data['transactions'])
-                
-                # Фильтруем только существующие транзакции
-                valid_transactions = []
-                invalid_transactions = []
-                
-                for tx in user_data['transactions']:
-                    tx_id = tx.get('id')
-                    if tx_id in valid_tx_ids:
-                        valid_transactions.append(tx)
-                        print(f"✅ Пользователь {user_id}: сохраняем транзакцию ID {tx_id}")
-                    else:
-                        invalid_transactions.append(tx)
-                        print(f"❌ Пользователь {user_id}: удаляем несуществующую транзакцию ID {tx_id}")
-                
-                user_data['transactions'] = valid_transactions
-                
+                # Одна выборка-comprehension вместо двух списков:
+                # количество удалённых выводим разностью длин
+                before = len(user_data['transactions'])
+                user_data['transactions'] = [
+                    tx for tx in user_data['transactions'] if tx.get('id') in valid_tx_ids
+                ]
+                removed = before - len(user_data['transactions'])
+
                 # Обновляем счетчик созданных транзакций
-                user_data['transactions_created'] = len(valid_transactions)
-                
-                if len(invalid_transactions) > 0:
+                user_data['transactions_created'] = len(user_data['transactions'])
+
+                if removed > 0:
                     cleaned = True
-                    print(f"🗑️  Удалено {len(invalid_transactions)} несуществующих транзакций для пользователя {user_id}")
-        
+                    msgs.append(f"🗑️  Удалено {removed} несуществующих транзакций для пользователя {user_id}")
+
+        if msgs:
+            sys.stdout.write('\n'.join(msgs) + '\n')
+
         if cleaned:
-            # Создаем бэкап
+            # Создаем бэкап копированием нетронутого файла —
+            # без повторного парсинга и сериализации JSON
             backup_file = self.scripts_users_data_file + '.backup.' + datetime.now().strftime('%Y%m%d_%H%M%S')
-            self.save_json_file(backup_file, self.load_json_file(self.scripts_users_data_file))
+            shutil.copyfile(self.scripts_users_data_file, backup_file)
             print(f"💾 Создан бэкап: {os.path.basename(backup_file)}")
             
             # Сохраняем очищенные данные
@@ -121,38 +147,38 @@ class DataCleaner:
         
         try:
             conn = sqlite3.connect(self.db_path)
+            # WAL + synchronous=NORMAL: один fsync на очистку и не блокируем
+            # пишущего в эту же БД бота
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA temp_store=MEMORY")
             cur = conn.cursor()
-            
-            # Получаем все транзакции из БД
-            cur.execute("SELECT id, user_id, amount_usdt, recipient FROM transactions")
-            db_transactions = cur.fetchall()
-            
-            if not db_transactions:
+
+            # Получаем только id: несуществующие находятся разностью множеств
+            cur.execute("SELECT id FROM transactions")
+            db_ids = {row[0] for row in cur.fetchall()}
+
+            if not db_ids:
                 print("📁 База данных пуста")
                 conn.close()
                 return
-            
-            print(f"📊 Найдено {len(db_transactions)} транзакций в базе данных")
-            
-            # Находим несуществующие транзакции
-            invalid_tx_ids = []
-            for tx in db_transactions:
-                tx_id, user_id, amount, recipient = tx
-                if tx_id not in valid_tx_ids:
-                    invalid_tx_ids.append(tx_id)
-                    print(f"❌ Найдена несуществующая транзакция в БД: ID {tx_id} (пользователь {user_id})")
-                else:
-                    print(f"✅ Валидная транзакция в БД: ID {tx_id}")
-            
-            # Удаляем несуществующие транзакции
+
+            print(f"📊 Найдено {len(db_ids)} транзакций в базе данных")
+
+            invalid_tx_ids = sorted(db_ids - valid_tx_ids)
+            for tx_id in invalid_tx_ids:
+                print(f"❌ Найдена несуществующая транзакция в БД: ID {tx_id}")
+
+            # Удаляем несуществующие транзакции одним DELETE в одной транзакции
             if invalid_tx_ids:
                 placeholders = ','.join('?' * len(invalid_tx_ids))
+                cur.execute("BEGIN IMMEDIATE")
                 cur.execute(f"DELETE FROM transactions WHERE id IN ({placeholders})", invalid_tx_ids)
                 conn.commit()
                 print(f"🗑️  Удалено {len(invalid_tx_ids)} несуществующих транзакций из БД")
             else:
                 print("✅ База данных не нуждается в очистке")
-            
+
             conn.close()
             
         except Exception as e:
@@ -7,6 +7,7 @@ import json
 import sqlite3
 import time
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 import sys
 import os
 
@@ -78,6 +79,22 @@ def sync_pending_transactions():
         # Получаем общее количество транзакций в блокчейне
         total_transactions = client.get_transaction_count()
         print(f"📊 Всего транзакций в блокчейне: {total_transactions}")
+
+        # Свежие pending-сделки могут быть только среди последних транзакций —
+        # ограничиваем окно проверки сразу, а не фильтром внутри цикла
+        lower = max(0, total_transactions - 10)
+
+        # Окно одно и то же для всех pending uuid — запрашиваем его один раз
+        # и параллельно, дальше сверяем все uuid по данным в памяти
+        def fetch_tx(blockchain_id):
+            try:
+                return blockchain_id, client.get_transaction(blockchain_id)
+            except Exception as e:
+                print(f"   ⚠️ Ошибка при проверке транзакции {blockchain_id}: {e}")
+                return blockchain_id, None
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            recent_txs = list(pool.map(fetch_tx, range(total_transactions - 1, lower - 1, -1)))
         
         # Подключаемся к базе данных
         db_path = os.path.join(os.path.dirname(__file__), '..', 'bots', 'unified_escrow.db')
@@ -97,32 +114,26 @@ def sync_pending_transactions():
             print(f"   💰 Сумма: {amount} USDT")
             print(f"   📨 Получатель: {recipient}")
             
-            # Проверяем все транзакции в блокчейне, начиная с последней
+            # Проверяем последние 10 транзакций в блокчейне, начиная с последней
             found_blockchain_id = None
-            
-            for blockchain_id in range(total_transactions - 1, -1, -1):
-                try:
-                    tx_info = client.get_transaction(blockchain_id)
-                    if not tx_info:
-                        continue
-                        
-                    # Сравниваем параметры транзакции
-                    blockchain_recipient = tx_info.get('recipient', '')
-                    blockchain_amount = tx_info.get('amount', 0) / 1000000  # Конвертируем из микро-USDT
-                    
-                    # Проверяем совпадение по получателю и статусу AWAITING_DELIVERY
-                    # (Поскольку amount часто показывает 0 в контракте)
-                    tx_state = tx_info.get('state', '')
-                    if (blockchain_recipient.lower() == recipient.lower() and 
-                        tx_state == 'AWAITING_DELIVERY' and blockchain_id >= total_transactions - 10):  # Проверяем только последние 10 транзакций
-                        found_blockchain_id = blockchain_id
-                        print(f"   ✅ Найдена в блокчейне с ID: {blockchain_id}")
-                        print(f"   📊 Статус: {tx_info.get('state', 'Unknown')}")
-                        break
-                        
-                except Exception as e:
-                    print(f"   ⚠️ Ошибка при проверке транзакции {blockchain_id}: {e}")
+
+            for blockchain_id, tx_info in recent_txs:
+                if not tx_info:
                     continue
+
+                # Сравниваем параметры транзакции
+                blockchain_recipient = tx_info.get('recipient', '')
+                blockchain_amount = tx_info.get('amount', 0) / 1000000  # Конвертируем из микро-USDT
+
+                # Проверяем совпадение по получателю и статусу AWAITING_DELIVERY
+                # (Поскольку amount часто показывает 0 в контракте)
+                tx_state = tx_info.get('state', '')
+                if (blockchain_recipient.lower() == recipient.lower() and
+                    tx_state == 'AWAITING_DELIVERY'):
+                    found_blockchain_id = blockchain_id
+                    print(f"   ✅ Найдена в блокчейне с ID: {blockchain_id}")
+                    print(f"   📊 Статус: {tx_info.get('state', 'Unknown')}")
+                    break
             
             if found_blockchain_id is not None:
                 # Добавляем в базу данных